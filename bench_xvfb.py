@@ -0,0 +1,287 @@
+"""端到端输入保真度与吞吐量测试（Linux / Xvfb）
+
+启动无头 Xvfb 和一个本地 Tk 文本框作为目标窗口，通过真实的热键路径
+（on_press → handle_hotkey）输入探测文本，读回目标窗口收到的内容，
+统计每个 input_delay 下的实际字符/秒和错误率。需要安装 Xvfb，
+以及 pyperclip 在 Linux 上使用的剪贴板工具（xclip 或 xsel）：
+    
+    python bench_xvfb.py --delays 1,2,5,10,20 --length 2000
+    python bench_xvfb.py --backend xtest --json e2e.json
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import shutil
+import string
+import subprocess
+import sys
+import threading
+import time
+
+# 目标窗口内容停止变化多久后认为输入结束（秒）
+IDLE_TIMEOUT = 1.5
+
+# 读取目标窗口内容的间隔（秒）
+POLL_INTERVAL = 0.05
+
+
+def make_probe(length, seed=0):
+    """生成包含字母、数字、标点、空格和换行的探测文本"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + string.punctuation + '      '
+    chars = [rng.choice(alphabet) for _ in range(length)]
+    for i in range(60, length, 60):
+        chars[i] = '\n'
+    return ''.join(chars)
+
+
+def run_target():
+    """目标窗口进程：通过标准输入接收命令，通过标准输出返回结果"""
+    import tkinter as tk
+    
+    root = tk.Tk()
+    root.title("bench-target")
+    root.geometry("800x600+0+0")
+    text = tk.Text(root, undo=False, wrap="none")
+    text.pack(fill="both", expand=True)
+    
+    def reply(value):
+        sys.stdout.write(json.dumps(value) + "\n")
+        sys.stdout.flush()
+    
+    def handle_command(*_):
+        command = sys.stdin.readline().strip()
+        if not command or command == "quit":
+            root.destroy()
+            return
+        if command == "clear":
+            text.delete("1.0", "end")
+            reply("ok")
+        elif command == "focus":
+            root.lift()
+            root.focus_force()
+            text.focus_set()
+            reply("ok")
+        elif command == "read":
+            reply(text.get("1.0", "end-1c"))
+        elif command == "len":
+            reply(len(text.get("1.0", "end-1c")))
+    
+    root.tk.createfilehandler(sys.stdin, tk.READABLE, handle_command)
+    root.after(100, lambda: (root.focus_force(), text.focus_set()))
+    reply("ready")
+    root.mainloop()
+
+
+class Target:
+    """目标窗口进程的客户端"""
+    
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--target"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+        self.lock = threading.Lock()
+        self._receive()
+    
+    def _receive(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("目标窗口进程已退出")
+        return json.loads(line)
+    
+    def call(self, command):
+        with self.lock:
+            self.process.stdin.write(command + "\n")
+            self.process.stdin.flush()
+            return self._receive()
+    
+    def close(self):
+        try:
+            self.process.stdin.write("quit\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+def start_xvfb(display):
+    """启动 Xvfb 并等待其就绪"""
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("未找到 Xvfb，请先安装（如 apt install xvfb）")
+    process = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", "1280x720x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    deadline = time.time() + 10
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.time() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb 启动失败: {display}")
+        time.sleep(0.05)
+    return process
+
+
+def error_rate(expected, received):
+    """按编辑差异计算错误率（丢失与多余的字符都计入）"""
+    matched = sum(block.size for block in
+                  difflib.SequenceMatcher(None, expected, received, autojunk=False).get_matching_blocks())
+    errors = (len(expected) - matched) + (len(received) - matched)
+    return errors / len(expected) if expected else 0.0
+
+
+def trigger_hotkey(app):
+    """模拟按下并松开第一个配置的快捷键，走真实的 on_press 路径"""
+    combo = list(app.hotkeys[0])
+    for key in combo:
+        app.on_press(key)
+    for key in combo:
+        app.on_release(key)
+
+
+def wait_for_arrival(target, expected_length, timeout):
+    """等待目标窗口收到内容，返回（首字符到达时间，最后字符到达时间）"""
+    start = time.perf_counter()
+    first = last = None
+    length = 0
+    while time.perf_counter() - start < timeout:
+        current = target.call("len")
+        now = time.perf_counter()
+        if current != length:
+            length = current
+            last = now
+            if first is None:
+                first = now
+            if length >= expected_length:
+                break
+        elif last is not None and now - last > IDLE_TIMEOUT:
+            break
+        time.sleep(POLL_INTERVAL)
+    return first, last
+
+
+def run_trials(app, target, probe, delays, results, done):
+    """在后台线程中依次测试每个延迟"""
+    # 校准得到的 delay_profile 会覆盖 input_delay，测试期间移除，结束后恢复
+    saved = {key: app.config[key] for key in ('input_delay', 'delay_profile') if key in app.config}
+    try:
+        time.sleep(1.0)
+        for delay_ms in delays:
+            app.config.pop('delay_profile', None)
+            app.config['input_delay'] = delay_ms / 1000
+            target.call("clear")
+            target.call("focus")
+            app.root.after(0, lambda: (app.root.clipboard_clear(), app.root.clipboard_append(probe)))
+            time.sleep(0.3)
+            
+            trigger_hotkey(app)
+            timeout = 30 + len(probe) * delay_ms / 1000 * 3
+            first, last = wait_for_arrival(target, len(probe), timeout)
+            received = target.call("read")
+            
+            if first is None:
+                rate = 0.0
+            elif last > first:
+                rate = (len(received) - 1) / (last - first)
+            else:
+                rate = float(len(received))
+            result = {
+                'input_delay_ms': delay_ms,
+                'chars_sent': len(probe),
+                'chars_received': len(received),
+                'chars_per_sec': rate,
+                'error_rate': error_rate(probe, received),
+            }
+            results.append(result)
+            print(f"{delay_ms:>10g}{len(received):>10}{rate:>12.1f}{result['error_rate'] * 100:>10.2f}%",
+                  flush=True)
+            
+            # 等待本次任务的防抖时间结束
+            time.sleep(app.debounce_time + 0.5)
+    except Exception as e:
+        print(f"测试失败: {e}", flush=True)
+    finally:
+        app.config.pop('delay_profile', None)
+        app.config.update(saved)
+        done.set()
+        app.root.after(0, app.root.quit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端输入保真度与吞吐量测试")
+    parser.add_argument('--delays', default="1,2,5,10,20",
+                        help="逗号分隔的 input_delay 列表（毫秒）")
+    parser.add_argument('--length', type=int, default=1000, help="探测文本长度")
+    parser.add_argument('--backend', default=None, help="覆盖配置中的 injection_backend")
+    parser.add_argument('--display', default=None,
+                        help="使用已有的 X 显示（如 :0），默认启动新的 Xvfb :99")
+    parser.add_argument('--json', help="将结果写入 JSON 文件")
+    parser.add_argument('--target', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.target:
+        run_target()
+        return
+    
+    if not sys.platform.startswith('linux'):
+        print("端到端测试仅支持 Linux / Xvfb")
+        sys.exit(1)
+    
+    xvfb = None
+    if args.display:
+        os.environ['DISPLAY'] = args.display
+    else:
+        xvfb = start_xvfb(":99")
+        os.environ['DISPLAY'] = ":99"
+    
+    target = None
+    try:
+        # DISPLAY 设置好之后才能导入 pynput 与界面模块
+        from main_gui import AutoInputGUI
+        
+        target = Target()
+        app = AutoInputGUI()
+        if args.backend:
+            app.config['injection_backend'] = args.backend
+            # 注入线程启动时已按配置创建后端，改写后需重新创建
+            app.worker.reset_backend()
+        app.root.withdraw()
+        app.start_listening()
+        
+        delays = [float(value) for value in args.delays.split(',') if value.strip()]
+        probe = make_probe(args.length)
+        results = []
+        done = threading.Event()
+        
+        print(f"{'延迟(ms)':>10}{'收到字符':>10}{'字符/秒':>12}{'错误率':>10}", flush=True)
+        threading.Thread(
+            target=run_trials, args=(app, target, probe, delays, results, done), daemon=True
+        ).start()
+        app.root.mainloop()
+        done.wait()
+        app.stop_listening()
+        
+        clean = [r for r in results if r['error_rate'] == 0]
+        if clean:
+            best = max(clean, key=lambda r: r['chars_per_sec'])
+            print(f"最大无差错速率: {best['chars_per_sec']:.1f} 字符/秒"
+                  f"（input_delay = {best['input_delay_ms']:g}ms）")
+        else:
+            print("所有延迟下均出现丢字或错字")
+        
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=4, ensure_ascii=False)
+            print(f"结果已保存到 {args.json}")
+    finally:
+        if target is not None:
+            target.close()
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+if __name__ == "__main__":
+    main()
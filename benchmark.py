@@ -0,0 +1,173 @@
+"""输入路径微基准测试
+
+使用不产生真实按键的记录后端驱动真实的按键计划编译与输入引擎，
+无需桌面环境即可测量热路径的性能：
+    
+    python benchmark.py
+    python benchmark.py --delay 1 --json bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# 无 X11 的 Linux 环境下使用 pynput 自带的 dummy 后端，记录后端不依赖真实键盘
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+    os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+
+from injection_backends import RecordingBackend
+from typing_engine import TypingEngine, compile_plan, default_profile, plan_length, stream_plan
+
+# 调度抖动测试使用的按键数
+JITTER_KEYSTROKES = 500
+
+
+def make_ascii(size):
+    """英文文本"""
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing",
+             "elit", "sed", "do", "eiusmod", "tempor", "Incididunt", "ut", "labore"]
+    rng = random.Random(1)
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return ' '.join(parts)[:size]
+
+
+def make_cjk(size):
+    """中文文本，夹杂少量标点"""
+    rng = random.Random(2)
+    chars = [chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(size)]
+    for i in range(20, size, 20):
+        chars[i] = '，'
+    return ''.join(chars)
+
+
+def make_code(size):
+    """缩进较深的代码文本"""
+    lines = []
+    length = 0
+    depth = 0
+    rng = random.Random(3)
+    while length < size:
+        line = '    ' * depth + rng.choice([
+            "if value is not None:",
+            "for item in items:",
+            "result.append(item * 2)",
+            "return {'key': value, 'count': len(items)}",
+            "\tlogger.info(f\"done: {result}\")",
+        ])
+        lines.append(line)
+        length += len(line) + 1
+        depth = (depth + 1) % 6 if line.endswith(':') else max(0, depth - rng.randint(0, 1))
+    return '\n'.join(lines)[:size]
+
+
+def make_blob(size):
+    """混合内容的大文本"""
+    part = make_ascii(size // 3) + '\n' + make_cjk(size // 3) + '\n' + make_code(size // 3)
+    return (part * (size // len(part) + 1))[:size]
+
+
+WORKLOADS = {
+    'ascii': lambda: make_ascii(50000),
+    'cjk': lambda: make_cjk(20000),
+    'code': lambda: make_code(50000),
+    'blob_1mb': lambda: make_blob(1024 * 1024),
+}
+
+
+def make_logger():
+    """基准测试期间不输出引擎日志"""
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def run_workload(text, delay, logger):
+    """测量一段文本的编译与输入开销"""
+    backend = RecordingBackend(record=False)
+    engine = TypingEngine(logger, backend)
+    
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    plan = compile_plan(text, default_profile(delay))
+    compiled = time.perf_counter()
+    engine.run(plan)
+    wall_end = time.perf_counter()
+    cpu_time = time.process_time() - cpu_start
+    
+    # 单独一轮测量峰值内存，避免 tracemalloc 影响计时
+    tracemalloc.start()
+    engine.run(compile_plan(text, default_profile(delay)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    # 流式生成按键计划时的峰值内存
+    tracemalloc.start()
+    engine.run(stream_plan(text, default_profile(delay)), total=plan_length(text))
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    keystrokes = len(plan)
+    return {
+        'keystrokes': keystrokes,
+        'compile_ms': (compiled - wall_start) * 1000,
+        'run_s': wall_end - compiled,
+        'keystrokes_per_sec': keystrokes / (wall_end - wall_start) if wall_end > wall_start else 0.0,
+        'cpu_s': cpu_time,
+        'peak_mb': peak / 1024 / 1024,
+        'stream_peak_mb': stream_peak / 1024 / 1024,
+    }
+
+
+def run_jitter(text, delay, logger):
+    """按指定延迟实际调度，测量调度抖动"""
+    engine = TypingEngine(logger, RecordingBackend(record=False))
+    cpu_start = time.process_time()
+    engine.run(compile_plan(text[:JITTER_KEYSTROKES], default_profile(delay)))
+    stats = dict(engine.last_stats)
+    stats['cpu_s'] = time.process_time() - cpu_start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输入路径微基准测试")
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help="调度抖动测试使用的基础延迟（毫秒），默认 1")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), action='append',
+                        help="只运行指定的文本类型，可重复指定")
+    parser.add_argument('--json', help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    
+    logger = make_logger()
+    names = args.workload or list(WORKLOADS)
+    results = {}
+    
+    print(f"{'文本':<10}{'按键数':>10}{'编译(ms)':>10}{'按键/秒':>14}{'CPU(s)':>9}{'峰值(MB)':>10}"
+          f"{'流式峰值(MB)':>12}{'p50(ms)':>9}{'p95(ms)':>9}{'p99(ms)':>9}")
+    for name in names:
+        text = WORKLOADS[name]()
+        overhead = run_workload(text, 0.0, logger)
+        jitter = run_jitter(text, args.delay / 1000, logger)
+        results[name] = {'overhead': overhead, 'jitter': jitter}
+        print(f"{name:<10}{overhead['keystrokes']:>10}{overhead['compile_ms']:>10.1f}"
+              f"{overhead['keystrokes_per_sec']:>14.0f}{overhead['cpu_s']:>9.2f}{overhead['peak_mb']:>10.1f}"
+              f"{overhead['stream_peak_mb']:>12.2f}"
+              f"{jitter['jitter_p50_ms']:>9.3f}{jitter['jitter_p95_ms']:>9.3f}{jitter['jitter_p99_ms']:>9.3f}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
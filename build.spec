@@ -18,6 +18,24 @@ a = Analysis(
         'pyperclip',
         'customtkinter',
         'config_manager',
+        'typing_engine',
+        'scheduler',
+        'paste_engine',
+        'injection_backends',
+        'layout_table',
+        'calibration',
+        'injection_worker',
+        'clipboard',
+        'clipboard_watcher',
+        'latency',
+        'hotkey_matcher',
+        'injection_journal',
+        'input_hub',
+        'config_watcher',
+        'log_buffer',
+        'progress',
+        'duration_estimator',
+        'process_engine',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,86 @@
+import string
+from typing_engine import CHAR_CLASSES, LETTER, OTHER, SPACE
+
+# 各字符类别的探测文本，只包含该类别的字符
+PROBES = {
+    LETTER: string.ascii_lowercase + string.ascii_uppercase,
+    SPACE: ' ' * 30,
+    OTHER: string.digits + ",.;/-=[]'",
+}
+
+# 二分查找的延迟范围与精度（秒）
+MIN_DELAY = 0.001
+MAX_DELAY = 0.05
+TOLERANCE = 0.0005
+
+# 每个候选延迟需要连续通过的次数
+DEFAULT_REPEATS = 2
+
+
+class CalibrationError(Exception):
+    """校准无法完成"""
+    pass
+
+
+class Calibrator:
+    """通过二分查找为每个字符类别寻找无丢字的最小输入延迟
+    
+    type_and_read(text, profile) 负责按给定延迟配置把 text 输入到验证控件，
+    并返回控件实际收到的内容；should_stop() 返回 True 时中止校准。
+    """
+    
+    def __init__(self, type_and_read, min_delay=MIN_DELAY, max_delay=MAX_DELAY,
+                 tolerance=TOLERANCE, repeats=DEFAULT_REPEATS, on_progress=None, should_stop=None):
+        self.type_and_read = type_and_read
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.tolerance = tolerance
+        self.repeats = repeats
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+    
+    def _report(self, message):
+        if self.on_progress:
+            self.on_progress(message)
+    
+    def _passes(self, char_class, delay, profile):
+        """以指定延迟输入该类别的探测文本，全部正确时返回 True"""
+        trial = dict(profile)
+        trial[char_class] = delay
+        probe = PROBES[char_class]
+        for _ in range(self.repeats):
+            if self.should_stop and self.should_stop():
+                raise CalibrationError("校准已取消")
+            if self.type_and_read(probe, trial) != probe:
+                return False
+        return True
+    
+    def calibrate_class(self, char_class, profile):
+        """二分查找单个字符类别的最小安全延迟"""
+        if not self._passes(char_class, self.max_delay, profile):
+            raise CalibrationError(
+                f"{char_class} 在最大延迟 {self.max_delay * 1000:.0f}ms 下仍然丢字，请检查目标窗口焦点"
+            )
+        
+        low, high = self.min_delay, self.max_delay
+        if self._passes(char_class, low, profile):
+            return low
+        
+        while high - low > self.tolerance:
+            mid = (low + high) / 2
+            passed = self._passes(char_class, mid, profile)
+            self._report(f"{char_class}: {mid * 1000:.1f}ms {'通过' if passed else '丢字'}")
+            if passed:
+                high = mid
+            else:
+                low = mid
+        return high
+    
+    def run(self):
+        """依次校准所有字符类别，返回延迟配置 {类别: 秒}"""
+        profile = {char_class: self.max_delay for char_class in CHAR_CLASSES}
+        for char_class in CHAR_CLASSES:
+            self._report(f"正在校准 {char_class}...")
+            profile[char_class] = round(self.calibrate_class(char_class, profile), 4)
+            self._report(f"{char_class} 最小安全延迟: {profile[char_class] * 1000:.1f}ms")
+        return profile
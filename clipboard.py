@@ -0,0 +1,251 @@
+import select
+import sys
+import threading
+import time
+import pyperclip
+
+try:
+    import Xlib.display
+    from Xlib import X
+except ImportError:
+    Xlib = None
+
+# 等待剪贴板所有者响应的最长时间（秒）
+DEFAULT_TIMEOUT = 1.0
+
+
+class ClipboardError(Exception):
+    """进程内读取剪贴板失败"""
+    pass
+
+
+class PyperclipClipboard:
+    """pyperclip 剪贴板（Linux 上每次读取都会启动 xclip / xsel 子进程）"""
+    
+    name = 'pyperclip'
+    
+    def paste(self):
+        return pyperclip.paste()
+    
+    def close(self):
+        pass
+
+
+class XlibClipboard:
+    """通过 X11 选择协议在进程内读取 CLIPBOARD，只请求文本格式"""
+    
+    name = 'xlib'
+    
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        if Xlib is None:
+            raise ClipboardError("未安装 python-xlib")
+        self.timeout = timeout
+        self.display = Xlib.display.Display()
+        self.window = self.display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent, event_mask=X.PropertyChangeMask
+        )
+        self.clipboard = self.display.intern_atom('CLIPBOARD')
+        self.targets = (self.display.intern_atom('UTF8_STRING'), self.display.intern_atom('STRING'))
+        self.incr = self.display.intern_atom('INCR')
+        self.property = self.display.intern_atom('AUTO_INPUT_CLIPBOARD')
+        self.lock = threading.Lock()
+    
+    def _next_event(self, matches, deadline):
+        """等待满足条件的事件，超时返回 None"""
+        while True:
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if matches(event):
+                    return event
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            select.select([self.display], [], [], remaining)
+    
+    def _read_incr(self, deadline, max_bytes=None):
+        """按 INCR 协议分段读取大块内容，超过 max_bytes 的部分读取后丢弃"""
+        chunks = []
+        size = 0
+        self.window.delete_property(self.property)
+        self.display.flush()
+        while True:
+            event = self._next_event(
+                lambda e: e.type == X.PropertyNotify and e.atom == self.property
+                and e.state == X.PropertyNewValue, deadline)
+            if event is None:
+                raise ClipboardError("分段读取剪贴板超时")
+            reply = self.window.get_full_property(self.property, X.AnyPropertyType)
+            self.window.delete_property(self.property)
+            self.display.flush()
+            if reply is None or not reply.value:
+                return b''.join(chunks)
+            # 超出上限后仍需读完每一段，让剪贴板所有者结束传输
+            if max_bytes is None or size < max_bytes:
+                chunks.append(bytes(reply.value))
+                size += len(reply.value)
+            # 每收到一段都延长超时
+            deadline = time.monotonic() + self.timeout
+    
+    def _convert(self, target, max_bytes=None):
+        """请求剪贴板所有者把内容转换为 target 格式，不支持时返回 None
+        
+        max_bytes 不为 None 时只从 X 服务器取回开头的部分数据。
+        """
+        self.window.convert_selection(self.clipboard, target, self.property, X.CurrentTime)
+        self.display.flush()
+        deadline = time.monotonic() + self.timeout
+        event = self._next_event(lambda e: e.type == X.SelectionNotify, deadline)
+        if event is None:
+            raise ClipboardError("剪贴板所有者无响应")
+        if event.property == X.NONE:
+            return None
+        
+        if max_bytes is None:
+            reply = self.window.get_full_property(self.property, X.AnyPropertyType)
+        else:
+            reply = self.window.get_property(self.property, X.AnyPropertyType, 0, (max_bytes + 3) // 4)
+        if reply is not None and reply.property_type == self.incr:
+            return self._read_incr(deadline, max_bytes)
+        self.window.delete_property(self.property)
+        self.display.flush()
+        return bytes(reply.value) if reply is not None else b''
+    
+    def paste(self, max_bytes=None):
+        with self.lock:
+            if self.display.get_selection_owner(self.clipboard) == X.NONE:
+                return ''
+            for target in self.targets:
+                data = self._convert(target, max_bytes)
+                if data is not None:
+                    encoding = 'utf-8' if target == self.targets[0] else 'latin-1'
+                    return data.decode(encoding, errors='replace')
+            raise ClipboardError("剪贴板内容不是文本")
+    
+    def paste_prefix(self, limit):
+        """只读取开头最多 limit 个字符，返回 (内容, 是否被截断)"""
+        # 每个字符的 UTF-8 编码最多 4 字节，多取 1 字节用于判断是否还有后续内容
+        text = self.paste(limit * 4 + 1)
+        return text[:limit], len(text) > limit
+    
+    def close(self):
+        try:
+            self.window.destroy()
+            self.display.close()
+        except Exception:
+            pass
+
+
+class TkClipboard:
+    """通过 Tk 的 clipboard_get 在进程内读取剪贴板，其他线程的调用转交给界面线程执行"""
+    
+    name = 'tk'
+    
+    def __init__(self, root, timeout=DEFAULT_TIMEOUT):
+        self.root = root
+        self.timeout = timeout
+        # 必须在界面线程中创建
+        self.ui_thread = threading.current_thread()
+    
+    def _get(self):
+        try:
+            return self.root.clipboard_get()
+        except Exception:
+            # 剪贴板为空或不是文本
+            return ''
+    
+    def paste(self):
+        if threading.current_thread() is self.ui_thread:
+            return self._get()
+        
+        result = []
+        done = threading.Event()
+        
+        def read():
+            result.append(self._get())
+            done.set()
+        
+        self.root.after(0, read)
+        if not done.wait(self.timeout):
+            raise ClipboardError("界面线程无响应")
+        return result[0]
+    
+    def close(self):
+        pass
+
+
+class Clipboard:
+    """剪贴板读写：读取使用进程内后端，失败时回退到 pyperclip；写入使用 pyperclip
+    
+    ui_provider 为 TkClipboard 时，界面线程中的读取直接使用 Tk，
+    避免剪贴板属于本程序的 Tk 窗口时界面线程等待自己响应。
+    """
+    
+    def __init__(self, provider, logger=None, ui_provider=None):
+        self.provider = provider
+        self.logger = logger
+        self.ui_provider = ui_provider
+        self.name = provider.name
+    
+    def paste(self):
+        provider = self.provider
+        if self.ui_provider is not None and threading.current_thread() is self.ui_provider.ui_thread:
+            provider = self.ui_provider
+        if provider.name != PyperclipClipboard.name:
+            try:
+                return provider.paste()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"进程内读取剪贴板失败，改用 pyperclip: {e}")
+        return pyperclip.paste()
+    
+    def paste_prefix(self, limit):
+        """读取剪贴板开头最多 limit 个字符，返回 (内容, 是否被截断)
+        
+        后端支持时只传输开头部分的数据，否则读取完整内容后截取。界面线程中
+        与 paste 一样使用 ui_provider 读取完整内容，剪贴板可能属于本程序的
+        Tk 窗口（在输入框或日志区复制），不能向自己请求转换。
+        """
+        provider = self.provider
+        on_ui_thread = self.ui_provider is not None and threading.current_thread() is self.ui_provider.ui_thread
+        if not on_ui_thread and hasattr(provider, 'paste_prefix'):
+            try:
+                return provider.paste_prefix(limit)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"进程内读取剪贴板失败，改用完整读取: {e}")
+        text = self.paste()
+        return text[:limit], len(text) > limit
+    
+    def copy(self, text):
+        pyperclip.copy(text)
+    
+    def close(self):
+        self.provider.close()
+
+
+def create_clipboard(config, root=None, logger=None):
+    """根据配置创建剪贴板，auto 时 Linux 优先使用 X11 选择协议，其次使用 Tk"""
+    name = config.get('clipboard_backend', 'auto')
+    timeout = config.get('clipboard_timeout', DEFAULT_TIMEOUT)
+    
+    ui_provider = TkClipboard(root, timeout) if root is not None and name != 'pyperclip' else None
+    candidates = []
+    if name == 'auto':
+        if sys.platform.startswith('linux'):
+            candidates.append('xlib')
+        # Windows 上 pyperclip 本身就在进程内读取
+        if sys.platform != 'win32':
+            candidates.append('tk')
+    elif name != 'pyperclip':
+        candidates.append(name)
+    
+    for candidate in candidates:
+        try:
+            if candidate == 'xlib':
+                return Clipboard(XlibClipboard(timeout), logger, ui_provider)
+            if candidate == 'tk' and ui_provider is not None:
+                return Clipboard(ui_provider, logger, ui_provider)
+        except Exception as e:
+            if logger:
+                logger.warning(f"剪贴板后端 {candidate} 不可用: {e}")
+    return Clipboard(PyperclipClipboard(), logger)
@@ -0,0 +1,164 @@
+import hashlib
+import select
+import sys
+import threading
+import time
+from typing_engine import compile_plan
+
+try:
+    import Xlib.display
+    from Xlib.ext import xfixes
+except ImportError:
+    Xlib = None
+
+# 不支持 XFixes 时轮询剪贴板的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.5
+
+# 热键触发时等待正在进行的快照刷新完成的最长时间（秒）
+DEFAULT_SNAPSHOT_TIMEOUT = 1.0
+
+# 超过该字符数的内容不预编译按键计划，输入时流式生成，避免常驻一份完整的计划
+PRECOMPILE_LIMIT = 65536
+
+# 计算摘要时每次编码的字符数
+DIGEST_SEGMENT_SIZE = 65536
+
+
+def text_digest(text):
+    """计算剪贴板文本的摘要，用于判断内容是否变化；分段编码，不复制整段文本"""
+    digest = hashlib.blake2b(digest_size=16)
+    for i in range(0, len(text), DIGEST_SEGMENT_SIZE):
+        digest.update(text[i:i + DIGEST_SEGMENT_SIZE].encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class ClipboardSnapshot:
+    """剪贴板内容快照及其预编译的按键计划"""
+    
+    def __init__(self, text, digest, plan, profile):
+        self.text = text
+        self.digest = digest
+        self.plan = plan
+        # 编译按键计划时使用的延迟配置，为 None 时未编译
+        self.profile = profile
+        self.time = time.time()
+
+
+class ClipboardWatcher:
+    """后台监视剪贴板变化，保持最新的内容快照与按键计划
+    
+    Linux X11 上通过 XFixes 接收剪贴板所有者变化通知，其他情况下按固定间隔
+    轮询并比较内容摘要。profile_func() 返回当前的延迟配置，返回 None 时
+    不预编译按键计划（如分块粘贴模式）。
+    """
+    
+    def __init__(self, clipboard, profile_func, logger, on_change=None,
+                 poll_interval=DEFAULT_POLL_INTERVAL):
+        self.clipboard = clipboard
+        self.profile_func = profile_func
+        self.logger = logger
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.snapshot = None
+        # 为 True 时快照由变化通知驱动，可直接使用而无需重新读取
+        self.event_driven = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="clipboard-watcher", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stopping.set()
+    
+    def _update(self, text):
+        """用新读取的内容更新快照，内容与延迟配置都未变化时沿用原快照"""
+        digest = text_digest(text)
+        profile = self.profile_func()
+        with self._lock:
+            current = self.snapshot
+            if current is not None and current.digest == digest and current.profile == profile:
+                return current
+            if profile is not None and len(text) <= PRECOMPILE_LIMIT:
+                plan = compile_plan(text, profile)
+            else:
+                plan = None
+            snapshot = ClipboardSnapshot(text, digest, plan, profile)
+            self.snapshot = snapshot
+        
+        if self.on_change and (current is None or current.digest != digest):
+            try:
+                self.on_change(snapshot)
+            except Exception:
+                pass
+        return snapshot
+    
+    def refresh(self):
+        """立即读取剪贴板并更新快照"""
+        return self._update(self.clipboard.paste())
+    
+    def get(self, timeout=DEFAULT_SNAPSHOT_TIMEOUT):
+        """返回最新快照
+        
+        由变化通知驱动时直接返回缓存的快照（延迟配置变化时重新编译），
+        不读取剪贴板；轮询模式下快照可能已过期，重新读取后按摘要复用按键计划。
+        """
+        if self.event_driven and self._ready.wait(timeout):
+            snapshot = self.snapshot
+            if snapshot is not None:
+                if snapshot.profile != self.profile_func():
+                    return self._update(snapshot.text)
+                return snapshot
+        return self.refresh()
+    
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.warning(f"读取剪贴板快照失败: {e}")
+        finally:
+            self._ready.set()
+    
+    def _watch_xfixes(self):
+        """通过 XFixes 等待剪贴板所有者变化，不支持时返回 False"""
+        display = Xlib.display.Display()
+        try:
+            if not display.has_extension('XFIXES'):
+                return False
+            display.xfixes_query_version()
+            display.xfixes_select_selection_input(
+                display.screen().root, display.intern_atom('CLIPBOARD'),
+                xfixes.XFixesSetSelectionOwnerNotifyMask
+            )
+            display.flush()
+            self.event_driven = True
+            self._safe_refresh()
+            
+            while not self._stopping.is_set():
+                if not display.pending_events():
+                    select.select([display], [], [], 0.5)
+                    if not display.pending_events():
+                        continue
+                # 连续的多次变化只读取一次
+                while display.pending_events():
+                    display.next_event()
+                self._ready.clear()
+                self._safe_refresh()
+            return True
+        finally:
+            self.event_driven = False
+            display.close()
+    
+    def _run(self):
+        if Xlib is not None and sys.platform.startswith('linux'):
+            try:
+                if self._watch_xfixes():
+                    return
+            except Exception as e:
+                self.logger.warning(f"无法监听剪贴板变化通知，改为定时检查: {e}")
+        
+        self._safe_refresh()
+        while not self._stopping.wait(self.poll_interval):
+            self._safe_refresh()
@@ -1,42 +1,308 @@
+import hashlib
 import json
 import os
+import tempfile
+import threading
 from pynput.keyboard import Key, KeyCode
+from hotkey_matcher import HotkeyMatcher
+
+# 连续多次保存请求合并为一次写入的等待时间（秒）
+DEFAULT_SAVE_DELAY = 0.5
+
+# 数值配置项的取值范围：键 -> (最小值, 最大值)，None 表示不限
+NUMBER_RANGES = {
+    'debounce_time': (0, 10),
+    'input_delay': (0, 1),
+    'paste_chunk_size': (1, None),
+    'paste_settle_time': (0, 5),
+    'xtest_batch_size': (1, None),
+    'remap_cache_size': (1, None),
+    'job_queue_size': (1, None),
+    'release_wait_timeout': (0, 60),
+    'clipboard_timeout': (0.01, 60),
+    'clipboard_poll_interval': (0.05, 60),
+    'config_poll_interval': (0.05, 60),
+    'log_max_lines': (100, None),
+    'duration_warning_threshold': (0, None),
+}
+
+# 必须为整数的配置项
+INTEGER_KEYS = (
+    'paste_chunk_size', 'xtest_batch_size', 'remap_cache_size', 'job_queue_size', 'log_max_lines'
+)
+
+# 布尔配置项
+BOOLEAN_KEYS = ('job_coalesce', 'clipboard_watch', 'config_watch', 'typing_process')
+
+# 只能取若干值之一的配置项
+CHOICES = {
+    'input_mode': ('type', 'paste'),
+    'injection_backend': ('pynput', 'xtest', 'xtest_unicode', 'recording', 'null'),
+    'clipboard_backend': ('auto', 'xlib', 'tk', 'pyperclip'),
+}
+
+# 可在配置中使用的特殊键名称
+KEY_MAPPING = {
+    'alt_l': Key.alt_l,
+    'alt_r': Key.alt_r,
+    'alt': Key.alt,
+    'ctrl_l': Key.ctrl_l,
+    'ctrl_r': Key.ctrl_r,
+    'ctrl': Key.ctrl,
+    'shift': Key.shift,
+    'shift_l': Key.shift_l,
+    'shift_r': Key.shift_r,
+    'cmd': Key.cmd,
+    'cmd_l': Key.cmd_l,
+    'cmd_r': Key.cmd_r,
+    'enter': Key.enter,
+    'space': Key.space,
+    'tab': Key.tab,
+    'backspace': Key.backspace,
+    'delete': Key.delete,
+    'esc': Key.esc,
+    'up': Key.up,
+    'down': Key.down,
+    'left': Key.left,
+    'right': Key.right,
+    'home': Key.home,
+    'end': Key.end,
+    'page_up': Key.page_up,
+    'page_down': Key.page_down,
+    'f1': Key.f1, 'f2': Key.f2, 'f3': Key.f3, 'f4': Key.f4,
+    'f5': Key.f5, 'f6': Key.f6, 'f7': Key.f7, 'f8': Key.f8,
+    'f9': Key.f9, 'f10': Key.f10, 'f11': Key.f11, 'f12': Key.f12,
+}
+
+# 虚拟键码 -> Key 枚举，不在 KEY_MAPPING 中的特殊键按 vk_<键码> 保存，读取时还原为枚举成员
+# 多个成员键码相同时取先定义的成员
+VK_KEYS = {
+    key.value.vk: key for key in reversed(list(Key))
+    if getattr(key.value, 'vk', None) is not None
+}
+
+
+class ConfigError(Exception):
+    """配置文件无法读取或解析"""
+
+
+def content_digest(data):
+    """计算配置文件内容的摘要，用于判断文件是否真正变化"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 
 class ConfigManager:
     """配置管理器"""
     
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file="config.json", logger=None):
         self.config_file = config_file
+        self.logger = logger
+        # 本程序最近一次写入的内容摘要，监视文件变化时据此忽略自己的保存
+        self.written_digest = None
+        self._pending = None
+        self._save_timer = None
+        self._save_lock = threading.Lock()
         self.default_config = {
             "hotkeys": [
                 {"keys": ["alt_l", "g"], "description": "Alt + G"}
             ],
             "debounce_time": 0.5,
-            "input_delay": 0.01
+            "input_delay": 0.01,
+            "input_mode": "type",
+            "paste_chunk_size": 2000,
+            "paste_settle_time": 0.1,
+            "injection_backend": "pynput",
+            "xtest_batch_size": 64,
+            "remap_cache_size": 32,
+            "job_queue_size": 8,
+            "job_coalesce": True,
+            "abort_hotkey": ["esc"],
+            "pause_hotkey": ["f8"],
+            "release_wait_timeout": 2.0,
+            "clipboard_backend": "auto",
+            "clipboard_timeout": 1.0,
+            "clipboard_watch": True,
+            "clipboard_poll_interval": 0.5,
+            "config_watch": True,
+            "config_poll_interval": 1.0,
+            "log_max_lines": 1000,
+            "duration_warning_threshold": 60,
+            "typing_process": False
         }
     
+    def _report(self, message):
+        if self.logger:
+            self.logger.warning(message)
+        else:
+            print(message)
+    
+    def read_config(self):
+        """读取并校验配置文件，返回 (配置, 内容摘要)，无法解析时抛出 ConfigError"""
+        try:
+            with open(self.config_file, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise ConfigError(str(e)) from e
+        return self.parse_config(data), content_digest(data)
+    
+    def parse_config(self, data):
+        """解析并校验配置文件内容，无效的配置项以默认值代替并报告"""
+        try:
+            loaded = json.loads(data.decode('utf-8'))
+        except ValueError as e:
+            raise ConfigError(str(e)) from e
+        if not isinstance(loaded, dict):
+            raise ConfigError("顶层必须是 JSON 对象")
+        
+        config, errors = self.validate_config(loaded)
+        for error in errors:
+            self._report(f"配置项无效: {error}，使用默认值")
+        return config
+    
     def load_config(self):
         """加载配置"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"加载配置失败: {e}，使用默认配置")
-                return self.default_config.copy()
-        else:
-            return self.default_config.copy()
+                return self.read_config()[0]
+            except ConfigError as e:
+                self._report(f"加载配置失败: {e}，使用默认配置")
+        return self.validate_config({})[0]
+    
+    def validate_config(self, loaded):
+        """校验配置，返回 (补全默认值后的配置, 错误说明列表)
+        
+        类型或取值不合法的配置项以默认值代替，未知的配置项原样保留。
+        """
+        config = json.loads(json.dumps(self.default_config))
+        errors = []
+        for key, value in loaded.items():
+            if key == 'hotkeys':
+                hotkeys = self._validate_hotkeys(value, errors)
+                if hotkeys:
+                    config[key] = hotkeys
+                continue
+            if key in ('abort_hotkey', 'pause_hotkey'):
+                error = self._check_keys(value)
+                if error:
+                    errors.append(f"{key} {error}")
+                else:
+                    config[key] = value
+                continue
+            if key == 'delay_profile':
+                if isinstance(value, dict) and all(
+                    isinstance(d, (int, float)) and not isinstance(d, bool) and d >= 0
+                    for d in value.values()
+                ):
+                    config[key] = value
+                else:
+                    errors.append("delay_profile 的每个延迟必须是非负数")
+                continue
+            
+            error = self._check_value(key, value)
+            if error:
+                errors.append(f"{key} {error}")
+            else:
+                config[key] = value
+        return config, errors
+    
+    def _check_value(self, key, value):
+        """检查单个配置项，合法时返回 None，否则返回错误说明"""
+        if key in BOOLEAN_KEYS:
+            if not isinstance(value, bool):
+                return "必须是 true 或 false"
+        elif key in NUMBER_RANGES:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return "必须是数字"
+            if key in INTEGER_KEYS and not isinstance(value, int):
+                return "必须是整数"
+            low, high = NUMBER_RANGES[key]
+            if (low is not None and value < low) or (high is not None and value > high):
+                return f"超出范围 [{low}, {high if high is not None else '∞'}]"
+        elif key in CHOICES:
+            if value not in CHOICES[key]:
+                return f"必须是 {' / '.join(CHOICES[key])} 之一"
+        return None
+    
+    def _check_keys(self, key_strs):
+        """检查按键名称列表，合法时返回 None，否则返回错误说明"""
+        if not isinstance(key_strs, list) or not key_strs:
+            return "必须是非空的按键名称列表"
+        unknown = [k for k in key_strs if not isinstance(k, str) or not self.is_valid_key_name(k)]
+        if unknown:
+            return f"包含无法识别的按键名称: {', '.join(repr(k) for k in unknown)}"
+        return None
+    
+    def _validate_hotkeys(self, hotkeys, errors):
+        """返回合法的热键配置，丢弃无效的条目"""
+        if not isinstance(hotkeys, list):
+            errors.append("hotkeys 必须是列表")
+            return None
+        valid = []
+        for i, hotkey in enumerate(hotkeys):
+            if not isinstance(hotkey, dict):
+                errors.append(f"hotkeys[{i}] 必须是包含 keys 的对象")
+                continue
+            error = self._check_keys(hotkey.get('keys'))
+            if error:
+                errors.append(f"hotkeys[{i}] 的 keys {error}")
+                continue
+            description = hotkey.get('description')
+            if not isinstance(description, str):
+                description = ' + '.join(hotkey['keys'])
+            valid.append({'keys': hotkey['keys'], 'description': description})
+        if not valid:
+            errors.append("没有可用的热键")
+        return valid
     
     def save_config(self, config):
-        """保存配置"""
+        """保存配置
+        
+        先写入同目录下的临时文件再整体替换，写入中途出错或程序退出时原文件保持完整。
+        """
+        data = json.dumps(config, indent=4, ensure_ascii=False).encode('utf-8')
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        temp_path = None
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
+            fd, temp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+            # mkstemp 创建的文件仅所有者可读写，沿用原文件的权限
+            if os.path.exists(self.config_file):
+                os.chmod(temp_path, os.stat(self.config_file).st_mode & 0o7777)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.written_digest = content_digest(data)
+            os.replace(temp_path, self.config_file)
             return True
         except Exception as e:
-            print(f"保存配置失败: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            self._report(f"保存配置失败: {e}")
             return False
     
+    def save_config_later(self, config, delay=DEFAULT_SAVE_DELAY):
+        """延迟保存配置，等待期间的多次请求合并为一次写入（保存最后一次的配置）"""
+        with self._save_lock:
+            self._pending = config
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def flush(self):
+        """立即写入尚未保存的配置，没有时返回 True"""
+        with self._save_lock:
+            config, self._pending = self._pending, None
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        if config is None:
+            return True
+        return self.save_config(config)
+    
     def key_to_string(self, key):
         """将按键对象转换为字符串"""
         if isinstance(key, KeyCode):
@@ -45,68 +311,49 @@ class ConfigManager:
             else:
                 return f"vk_{key.vk}"
         else:
-            # Key枚举类型
-            return str(key).replace('Key.', '').lower()
+            # Key枚举类型，不在 KEY_MAPPING 中的特殊键按虚拟键码保存
+            name = str(key).replace('Key.', '').lower()
+            vk = getattr(key.value, 'vk', None)
+            if name not in KEY_MAPPING and vk is not None:
+                return f"vk_{vk}"
+            return name
     
     def string_to_key(self, key_str):
         """将字符串转换为按键对象"""
         key_str = key_str.lower()
         
-        # 尝试转换为Key枚举
-        key_mapping = {
-            'alt_l': Key.alt_l,
-            'alt_r': Key.alt_r,
-            'alt': Key.alt,
-            'ctrl_l': Key.ctrl_l,
-            'ctrl_r': Key.ctrl_r,
-            'ctrl': Key.ctrl,
-            'shift': Key.shift,
-            'shift_l': Key.shift_l,
-            'shift_r': Key.shift_r,
-            'cmd': Key.cmd,
-            'cmd_l': Key.cmd_l,
-            'cmd_r': Key.cmd_r,
-            'enter': Key.enter,
-            'space': Key.space,
-            'tab': Key.tab,
-            'backspace': Key.backspace,
-            'delete': Key.delete,
-            'esc': Key.esc,
-            'up': Key.up,
-            'down': Key.down,
-            'left': Key.left,
-            'right': Key.right,
-            'home': Key.home,
-            'end': Key.end,
-            'page_up': Key.page_up,
-            'page_down': Key.page_down,
-            'f1': Key.f1, 'f2': Key.f2, 'f3': Key.f3, 'f4': Key.f4,
-            'f5': Key.f5, 'f6': Key.f6, 'f7': Key.f7, 'f8': Key.f8,
-            'f9': Key.f9, 'f10': Key.f10, 'f11': Key.f11, 'f12': Key.f12,
-        }
-        
-        if key_str in key_mapping:
-            return key_mapping[key_str]
-        else:
-            # 单字符按键
-            if len(key_str) == 1:
-                return KeyCode(char=key_str)
-            elif key_str.startswith('vk_'):
-                # 虚拟键码
-                vk = int(key_str[3:])
-                return KeyCode(vk=vk)
-            else:
-                return KeyCode(char=key_str)
+        if key_str in KEY_MAPPING:
+            return KEY_MAPPING[key_str]
+        # 单字符按键
+        if len(key_str) == 1:
+            return KeyCode(char=key_str)
+        # 虚拟键码
+        if key_str.startswith('vk_') and key_str[3:].isdigit():
+            # 监听器对特殊键给出 Key 枚举，与相同键码的 KeyCode 并不相等
+            vk = int(key_str[3:])
+            return VK_KEYS.get(vk) or KeyCode(vk=vk)
+        raise ValueError(f"无法识别的按键名称: {key_str}")
+    
+    def is_valid_key_name(self, key_str):
+        """按键名称是否为已知的特殊键、单个字符或 vk_<虚拟键码>"""
+        key_str = key_str.lower()
+        if key_str in KEY_MAPPING or len(key_str) == 1:
+            return True
+        return key_str.startswith('vk_') and key_str[3:].isdigit()
     
     def hotkeys_from_config(self, config):
-        """从配置转换为热键集合列表"""
+        """从配置编译热键匹配器，可按下标访问各热键的按键集合"""
         hotkeys = []
         for hotkey_config in config.get('hotkeys', []):
             key_set = set()
             for key_str in hotkey_config['keys']:
                 key_set.add(self.string_to_key(key_str))
             hotkeys.append(key_set)
-        return hotkeys
+        return HotkeyMatcher(hotkeys)
+    
+    def keys_from_config(self, key_strs):
+        """将按键字符串列表转换为按键集合"""
+        return {self.string_to_key(key_str) for key_str in key_strs}
     
     def format_key_display(self, key):
         """格式化按键显示名称"""
@@ -0,0 +1,181 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from config_manager import ConfigError, content_digest
+
+# 不支持 inotify 时检查配置文件的间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+# 文件最后一次变化后等待该时间（秒）再读取，编辑器连续多次写入只重新加载一次
+DEFAULT_SETTLE_TIME = 0.2
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+# inotify_event 结构的定长部分：wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """通过 libc 的 inotify 接口监视目录中的文件变化（仅 Linux）"""
+    
+    def __init__(self, directory, mask=IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        # 监视所在目录而非文件本身，编辑器以改名方式替换文件后仍能收到通知
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch 失败")
+    
+    def fileno(self):
+        return self.fd
+    
+    def read_names(self):
+        """读出所有待处理的事件，返回涉及的文件名集合"""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return names
+            if not data:
+                return names
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                names.add(os.fsdecode(name))
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """监视配置文件，外部修改后自动重新加载
+    
+    Linux 上通过 inotify 接收变化通知，其他情况下按固定间隔比较文件的修改
+    时间与大小。真正读取前再比较内容摘要，内容未变或是本程序自己保存的
+    写入不会触发重新加载；无法解析的文件只报告错误，继续使用当前配置。
+    on_change(config) 在监视线程中调用。
+    """
+    
+    def __init__(self, config_manager, on_change, logger,
+                 poll_interval=DEFAULT_POLL_INTERVAL, settle_time=DEFAULT_SETTLE_TIME):
+        self.config_manager = config_manager
+        self.on_change = on_change
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.path = os.path.abspath(config_manager.config_file)
+        self.digest = None
+        self._stat = None
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+    
+    def start(self):
+        self._stat = self._file_stat()
+        try:
+            with open(self.path, 'rb') as f:
+                self.digest = content_digest(f.read())
+        except OSError:
+            self.digest = None
+        self._thread.start()
+    
+    def stop(self):
+        self._stopping.set()
+    
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _settle(self):
+        """等待文件停止变化"""
+        stat = self._file_stat()
+        while not self._stopping.wait(self.settle_time):
+            current = self._file_stat()
+            if current == stat:
+                break
+            stat = current
+    
+    def check(self):
+        """读取配置文件，内容确有变化时校验并通知，返回是否重新加载"""
+        self._stat = self._file_stat()
+        if self._stat is None:
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            self.logger.warning(f"读取配置文件失败: {e}")
+            return False
+        
+        digest = content_digest(data)
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        if digest == self.config_manager.written_digest:
+            # 本程序自己保存的内容，只认领一次，之后改回相同内容仍会重新加载
+            self.config_manager.written_digest = None
+            return False
+        
+        try:
+            config = self.config_manager.parse_config(data)
+        except ConfigError as e:
+            self.logger.error(f"配置文件格式错误，继续使用当前配置: {e}")
+            return False
+        self.on_change(config)
+        return True
+    
+    def _safe_check(self):
+        try:
+            self.check()
+        except Exception as e:
+            self.logger.error(f"重新加载配置失败: {e}")
+    
+    def _watch_inotify(self):
+        directory, name = os.path.split(self.path)
+        inotify = Inotify(directory)
+        try:
+            while not self._stopping.is_set():
+                if not select.select([inotify], [], [], 0.5)[0]:
+                    continue
+                if name not in inotify.read_names():
+                    continue
+                # 合并随后一段时间内的事件
+                while select.select([inotify], [], [], self.settle_time)[0]:
+                    inotify.read_names()
+                    if self._stopping.is_set():
+                        return
+                self._safe_check()
+        finally:
+            inotify.close()
+    
+    def _run(self):
+        if sys.platform.startswith('linux'):
+            try:
+                self._watch_inotify()
+                return
+            except Exception as e:
+                self.logger.warning(f"无法监听配置文件变化通知，改为定时检查: {e}")
+        
+        while not self._stopping.wait(self.poll_interval):
+            if self._file_stat() != self._stat:
+                self._settle()
+                self._safe_check()
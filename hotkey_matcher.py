@@ -0,0 +1,55 @@
+class HotkeyMatcher:
+    """热键匹配器：每个出现在热键中的按键分配一位，按住状态保存为位掩码
+    
+    每次按键只需一次字典查找得到该键的位，再以按住状态的位掩码查找恰好
+    由这些按键组成的热键，开销与热键数量无关。按下不属于任何热键的按键
+    不改变状态；按下的顺序不影响匹配。
+    """
+    
+    def __init__(self, combos):
+        self.combos = [frozenset(combo) for combo in combos]
+        self.bits = {}
+        for combo in self.combos:
+            for key in combo:
+                if key not in self.bits:
+                    self.bits[key] = 1 << len(self.bits)
+        
+        # 位掩码 -> 热键下标，重复的组合只保留第一个
+        self.index = {}
+        for i, combo in enumerate(self.combos):
+            mask = 0
+            for key in combo:
+                mask |= self.bits[key]
+            if mask:
+                self.index.setdefault(mask, i)
+        self.held = 0
+    
+    def __len__(self):
+        return len(self.combos)
+    
+    def __iter__(self):
+        return iter(self.combos)
+    
+    def __getitem__(self, i):
+        return self.combos[i]
+    
+    def press(self, key):
+        """记录按下，返回由此凑齐的热键下标，没有时返回 None"""
+        bit = self.bits.get(key)
+        if bit is None:
+            return None
+        self.held |= bit
+        return self.index.get(self.held)
+    
+    def release(self, key):
+        """记录松开"""
+        bit = self.bits.get(key)
+        if bit is not None:
+            self.held &= ~bit
+    
+    def sync(self, keys):
+        """按当前按住的按键集合重建按住状态"""
+        held = 0
+        for key in keys:
+            held |= self.bits.get(key, 0)
+        self.held = held
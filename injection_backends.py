@@ -0,0 +1,366 @@
+import sys
+from collections import OrderedDict
+from pynput import keyboard
+from pynput.keyboard import Key, KeyCode
+from layout_table import ALTGR, DEFAULT_CACHE_FILE, SHIFT, load_layout_table
+
+try:
+    import Xlib.display
+    import Xlib.X
+    import Xlib.XK
+    import Xlib.ext.xtest
+except ImportError:
+    Xlib = None
+
+# XTest 后端默认每批最多缓存的按键事件数
+DEFAULT_BATCH_SIZE = 64
+
+# Unicode 重映射后端默认最多同时保留的 keycode 绑定数
+DEFAULT_REMAP_CACHE_SIZE = 32
+
+
+def is_control_char(char):
+    """是否为 C0 / C1 控制字符（含 DEL）"""
+    code = ord(char)
+    return code < 0x20 or 0x7f <= code < 0xa0
+
+
+class PynputBackend:
+    """基于 pynput Controller 的默认注入后端"""
+    
+    name = 'pynput'
+    
+    def __init__(self):
+        self.controller = keyboard.Controller()
+    
+    def press(self, key):
+        self.controller.press(key)
+    
+    def release(self, key):
+        self.controller.release(key)
+    
+    def flush(self):
+        """pynput 每个事件都会立即发送，无需刷新"""
+        pass
+    
+    def prepare(self):
+        pass
+    
+    def finish(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class RecordingBackend:
+    """不产生真实按键的后端，可选记录事件，用于基准测试和无桌面环境"""
+    
+    name = 'recording'
+    
+    def __init__(self, record=True):
+        self.events = [] if record else None
+        self.count = 0
+    
+    def press(self, key):
+        self.count += 1
+        if self.events is not None:
+            self.events.append((True, key))
+    
+    def release(self, key):
+        self.count += 1
+        if self.events is not None:
+            self.events.append((False, key))
+    
+    def flush(self):
+        pass
+    
+    def prepare(self):
+        pass
+    
+    def finish(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class XTestBackend:
+    """Linux X11 批量注入后端：XTest 事件先写入缓冲区，每批只刷新一次显示连接
+    
+    字符通过预编译的布局表直接查到 keycode 与修饰键，Shift / AltGr
+    只在需要它们的连续字符前后按下和松开，而不是包住每个字符。每个任务
+    开始前处理键盘映射变化通知，映射被修改后重新加载布局表。
+    """
+    
+    name = 'xtest'
+    
+    # 本后端自己修改映射的 keycode，这些 keycode 的变化通知不触发重新加载
+    owned_keycodes = frozenset()
+    
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, layout_cache_file=DEFAULT_CACHE_FILE):
+        if Xlib is None:
+            raise RuntimeError("XTest 后端需要 python-xlib")
+        self.display = Xlib.display.Display()
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X 服务器不支持 XTEST 扩展")
+        
+        self.batch_size = max(1, int(batch_size))
+        self.pending = 0
+        self.layout_cache_file = layout_cache_file
+        self.modifier_keysyms = {SHIFT: Xlib.XK.XK_Shift_L, ALTGR: Xlib.XK.XK_ISO_Level3_Shift}
+        try:
+            self._load_layout()
+        except Exception:
+            self.display.close()
+            raise
+        self.modifiers = 0  # 当前由后端按住的修饰键
+        self.fallback = None
+        # 后端自行发送的按键事件的回调 (按键, 是否按下)，由 JournaledBackend 设置
+        self.on_implicit = None
+    
+    def _load_layout(self):
+        """加载当前布局的映射表与修饰键的 keycode"""
+        self.layout = load_layout_table(self.display, self.layout_cache_file, self.owned_keycodes)
+        self.modifier_keycodes = {
+            mask: self.display.keysym_to_keycode(keysym) for mask, keysym in self.modifier_keysyms.items()
+        }
+        # 当前映射中没有对应按键的修饰键，需要它们的字符不能通过布局表输入
+        self.missing_modifiers = 0
+        for mask, keycode in self.modifier_keycodes.items():
+            if not keycode:
+                self.missing_modifiers |= mask
+        self.keycodes = {}  # 非字符按键 -> (keycode, 修饰键)
+    
+    def prepare(self):
+        """任务开始前处理键盘映射变化通知，其他程序修改映射后重新加载布局表"""
+        changed = False
+        while self.display.pending_events():
+            event = self.display.next_event()
+            if event.type != Xlib.X.MappingNotify or event.request == Xlib.X.MappingPointer:
+                continue
+            self.display.refresh_keyboard_mapping(event)
+            keycodes = range(event.first_keycode, event.first_keycode + event.count)
+            if event.request != Xlib.X.MappingKeyboard or not self.owned_keycodes.issuperset(keycodes):
+                changed = True
+        if changed:
+            self._load_layout()
+    
+    def _keysym(self, key):
+        """将按键转换为 keysym"""
+        if isinstance(key, Key):
+            # X11 下 Key 枚举的 vk 即 keysym
+            return key.value.vk
+        if isinstance(key, KeyCode):
+            if key.vk is not None:
+                return key.vk
+            key = key.char
+        ordinal = ord(key)
+        return ordinal if ordinal < 0x100 else ordinal | 0x01000000
+    
+    def _resolve(self, key):
+        """解析按键对应的 keycode 与修饰键，无法解析时返回 None"""
+        if isinstance(key, KeyCode):
+            if key.char is None:
+                return self._resolve_key(key)
+            key = key.char
+        elif not isinstance(key, str):
+            return self._resolve_key(key)
+        
+        resolved = self.layout.get(key)
+        if resolved is not None and resolved[1] & self.missing_modifiers:
+            # 所需的修饰键在当前映射中不存在，直接按下 keycode 会输入错误的字符
+            return None
+        return resolved
+    
+    def _resolve_key(self, key):
+        """解析非字符按键"""
+        try:
+            return self.keycodes[key]
+        except KeyError:
+            pass
+        
+        keycode = self.display.keysym_to_keycode(self._keysym(key))
+        resolved = (keycode, 0) if keycode else None
+        self.keycodes[key] = resolved
+        return resolved
+    
+    def _fake(self, event_type, keycode):
+        Xlib.ext.xtest.fake_input(self.display, event_type, keycode)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+    
+    def _set_modifiers(self, modifiers):
+        """按下或松开修饰键，使当前状态与 modifiers 一致"""
+        changed = self.modifiers ^ modifiers
+        if not changed:
+            return
+        for mask, keycode in self.modifier_keycodes.items():
+            if changed & mask and keycode:
+                pressed = bool(modifiers & mask)
+                if self.on_implicit is not None:
+                    self.on_implicit(KeyCode.from_vk(self.modifier_keysyms[mask]), pressed)
+                self._fake(Xlib.X.KeyPress if pressed else Xlib.X.KeyRelease, keycode)
+        self.modifiers = modifiers
+    
+    def _resolve_missing(self, key):
+        """解析当前布局中不存在的按键，返回 None 表示交给 pynput 处理
+        
+        返回的修饰键为 None 时表示该按键与修饰键状态无关。
+        """
+        return None
+    
+    def _send(self, key, is_press):
+        resolved = self._resolve(key) or self._resolve_missing(key)
+        if resolved is None:
+            # 当前布局中不存在的字符交给 pynput 处理，先发送已缓存的事件保证顺序
+            self._set_modifiers(0)
+            self.flush()
+            if self.fallback is None:
+                self.fallback = keyboard.Controller()
+            if is_press:
+                self.fallback.press(key)
+            else:
+                self.fallback.release(key)
+            return
+        
+        keycode, modifiers = resolved
+        if modifiers is None and self.on_implicit is not None:
+            # 临时绑定的 keycode 在监听器中可能只解析出 keysym，按 keysym 再记录一条
+            self.on_implicit(KeyCode.from_vk(self._keysym(key)), is_press)
+        if is_press:
+            if modifiers is not None:
+                self._set_modifiers(modifiers)
+            self._fake(Xlib.X.KeyPress, keycode)
+        else:
+            self._fake(Xlib.X.KeyRelease, keycode)
+    
+    def press(self, key):
+        self._send(key, True)
+    
+    def release(self, key):
+        self._send(key, False)
+    
+    def flush(self):
+        """将缓存的事件一次性发送给 X 服务器（不等待回复）"""
+        if self.pending:
+            self.display.flush()
+            self.pending = 0
+    
+    def finish(self):
+        """松开后端按住的修饰键并发送剩余事件"""
+        self._set_modifiers(0)
+        self.flush()
+    
+    def close(self):
+        self.finish()
+        self.display.close()
+
+
+class UnicodeRemapBackend(XTestBackend):
+    """在 XTest 后端基础上，将布局外字符临时绑定到空闲 keycode
+    
+    绑定按 LRU 缓存复用，长文本中重复出现的中文、符号和 emoji
+    不必每次都修改键盘映射，关闭后端时恢复空闲 keycode。
+    """
+    
+    name = 'xtest_unicode'
+    
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, cache_size=DEFAULT_REMAP_CACHE_SIZE,
+                 layout_cache_file=DEFAULT_CACHE_FILE):
+        super().__init__(batch_size, layout_cache_file)
+        min_keycode = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - min_keycode + 1
+        try:
+            mapping = self.display.get_keyboard_mapping(min_keycode, count)
+        except Exception:
+            self.display.close()
+            raise
+        self.keysyms_per_keycode = len(mapping[0]) if mapping else 2
+        
+        # 未绑定任何 keysym 的 keycode 可以临时借用
+        spare = [min_keycode + i for i, keysyms in enumerate(mapping) if not any(keysyms)]
+        if not spare:
+            self.display.close()
+            raise RuntimeError("键盘映射中没有空闲的 keycode")
+        self.free_keycodes = spare[:max(1, int(cache_size))]
+        self.owned_keycodes = frozenset(self.free_keycodes)
+        self.bindings = OrderedDict()  # keysym -> keycode，按最近使用排序
+    
+    def _load_layout(self):
+        if self.owned_keycodes:
+            self._release_taken_keycodes()
+        super()._load_layout()
+    
+    def _release_taken_keycodes(self):
+        """借用的 keycode 被其他程序改写后不再使用"""
+        min_keycode = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - min_keycode + 1
+        mapping = self.display.get_keyboard_mapping(min_keycode, count)
+        current = {keycode: mapping[keycode - min_keycode] for keycode in self.owned_keycodes}
+        for keysym, keycode in list(self.bindings.items()):
+            if any(value != keysym for value in current[keycode]):
+                del self.bindings[keysym]
+        self.free_keycodes = [keycode for keycode in self.free_keycodes if not any(current[keycode])]
+        self.owned_keycodes = frozenset(self.free_keycodes) | frozenset(self.bindings.values())
+    
+    def _bind(self, keycode, keysym):
+        """将 keycode 的所有层级绑定到同一个 keysym，与 Shift 状态无关"""
+        self.display.change_keyboard_mapping(
+            keycode, [(keysym,) * self.keysyms_per_keycode]
+        )
+        self.pending += 1
+    
+    def _resolve_missing(self, key):
+        char = key if isinstance(key, str) else getattr(key, 'char', None)
+        if char is not None and is_control_char(char):
+            # 控制字符没有对应的 keysym，不占用空闲 keycode，由输入引擎记录无法输入
+            raise ValueError(f"控制字符无法输入: {char!r}")
+        keysym = self._keysym(key)
+        keycode = self.bindings.get(keysym)
+        if keycode is not None:
+            self.bindings.move_to_end(keysym)
+            return keycode, None
+        
+        if self.free_keycodes:
+            keycode = self.free_keycodes.pop()
+        else:
+            # 淘汰最久未使用的绑定
+            _, keycode = self.bindings.popitem(last=False)
+        self._bind(keycode, keysym)
+        self.bindings[keysym] = keycode
+        return keycode, None
+    
+    def close(self):
+        try:
+            for keycode in self.bindings.values():
+                self._bind(keycode, 0)
+            self.bindings.clear()
+        finally:
+            super().close()
+
+
+def create_backend(config, logger=None):
+    """根据配置创建注入后端，不可用时回退到 pynput"""
+    name = config.get('injection_backend', 'pynput')
+    if name == 'recording':
+        return RecordingBackend()
+    if name == 'null':
+        return RecordingBackend(record=False)
+    if name in ('xtest', 'xtest_unicode'):
+        if sys.platform.startswith('linux'):
+            batch_size = config.get('xtest_batch_size', DEFAULT_BATCH_SIZE)
+            try:
+                if name == 'xtest_unicode':
+                    return UnicodeRemapBackend(
+                        batch_size, config.get('remap_cache_size', DEFAULT_REMAP_CACHE_SIZE)
+                    )
+                return XTestBackend(batch_size)
+            except Exception as e:
+                if logger:
+                    logger.warning(f"XTest 后端不可用，使用 pynput: {e}")
+        elif logger:
+            logger.warning("XTest 后端仅支持 Linux X11，使用 pynput")
+    return PynputBackend()
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+# 注入的按键在该时间（秒）内没有被监听器收到则不再等待
+DEFAULT_EXPIRY = 1.0
+
+
+def key_token(key):
+    """把注入时使用的按键和监听器收到的按键统一为可比较的值
+    
+    有字符的按键取字符，其他按键取虚拟键码（X11 下即 keysym），Key 枚举与
+    相同键码的 KeyCode 视为同一个按键。
+    """
+    if isinstance(key, str):
+        return key
+    char = getattr(key, 'char', None)
+    if char is not None:
+        return char
+    vk = getattr(getattr(key, 'value', key), 'vk', None)
+    return vk if vk is not None else key
+
+
+class InjectionJournal:
+    """注入日志：记录本程序发送的按键，让全局监听器识别并忽略自己注入的事件
+    
+    注入后端每发送一个按下 / 松开事件就记录一条，监听器收到事件时消耗对应
+    的条目。没有注入进行时 is_injected 只做一次时间比较。
+    """
+    
+    def __init__(self, expiry=DEFAULT_EXPIRY):
+        self.expiry = expiry
+        self.last = 0.0
+        # {是否按下: {按键: deque[注入时刻]}}
+        self._pending = {True: {}, False: {}}
+        self._pruned = 0.0
+        self._lock = threading.Lock()
+    
+    def _prune(self, now):
+        """丢弃所有已过期的条目"""
+        for pending in self._pending.values():
+            for token in list(pending):
+                times = pending[token]
+                while times and now - times[0] > self.expiry:
+                    times.popleft()
+                if not times:
+                    del pending[token]
+        self._pruned = now
+    
+    def record(self, key, pressed, at=None):
+        """记录一个注入的事件，at 为预计发送的时刻（perf_counter），默认为当前时刻"""
+        now = time.perf_counter()
+        if at is None:
+            at = now
+        token = key_token(key)
+        with self._lock:
+            self.last = max(self.last, at)
+            if now - self._pruned > self.expiry:
+                self._prune(now)
+            times = self._pending[pressed].get(token)
+            if times is None:
+                times = self._pending[pressed][token] = deque()
+            times.append(at)
+    
+    def is_injected(self, key, pressed):
+        """判断监听器收到的事件是否由本程序注入，是则消耗对应的日志条目"""
+        now = time.perf_counter()
+        if now - self.last > self.expiry:
+            return False
+        
+        token = key_token(key)
+        with self._lock:
+            times = self._pending[pressed].get(token)
+            while times and now - times[0] > self.expiry:
+                times.popleft()
+            if times:
+                times.popleft()
+                return True
+        return False
+
+
+class JournaledBackend:
+    """包装注入后端，发送的每个按键都记入注入日志
+    
+    后端为输入字符自动发送的修饰键与重映射按键通过 on_implicit 回调记录。
+    """
+    
+    def __init__(self, backend, journal):
+        self.backend = backend
+        self.journal = journal
+        self.name = backend.name
+        self.flush = backend.flush
+        self.prepare = backend.prepare
+        self.finish = backend.finish
+        self.close = backend.close
+        if hasattr(backend, 'on_implicit'):
+            backend.on_implicit = journal.record
+    
+    def press(self, key):
+        self.journal.record(key, True)
+        self.backend.press(key)
+    
+    def release(self, key):
+        self.journal.record(key, False)
+        self.backend.release(key)
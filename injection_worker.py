@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import threading
+import time
+from scheduler import RunControl
+
+# 任务优先级，数值越小越先执行
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_DROPPED = 'dropped'      # 队列已满，未执行
+STATUS_COALESCED = 'coalesced'  # 被同类的新任务替换，未执行
+STATUS_ABORTED = 'aborted'      # 被中止热键中止
+
+STATUS_NAMES = {
+    STATUS_QUEUED: '等待中',
+    STATUS_RUNNING: '执行中',
+    STATUS_DONE: '已完成',
+    STATUS_FAILED: '失败',
+    STATUS_DROPPED: '已丢弃',
+    STATUS_COALESCED: '已合并',
+    STATUS_ABORTED: '已中止',
+}
+
+DEFAULT_QUEUE_SIZE = 8
+
+
+class InjectionJob:
+    """注入任务
+    
+    func(job, backend) 在注入线程中执行，应把 job.control 传给输入引擎以支持
+    中止与暂停；coalesce_key 相同的等待任务会被新任务替换，避免连续触发时
+    重复输入同一内容。
+    """
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, func, name, priority=PRIORITY_NORMAL, coalesce_key=None, estimate=None):
+        self.id = next(self._ids)
+        self.func = func
+        self.name = name
+        # 提交时预计的输入耗时（秒），未知时为 None
+        self.estimate = estimate
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.status = STATUS_QUEUED
+        self.error = None
+        self.created = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        self.control = RunControl()
+    
+    def __repr__(self):
+        return f"<InjectionJob #{self.id} {self.name} {self.status}>"
+
+
+class InjectionWorker:
+    """常驻注入线程：持有预热的注入后端，按优先级消费有界任务队列"""
+    
+    def __init__(self, backend_factory, logger, max_jobs=DEFAULT_QUEUE_SIZE,
+                 coalesce=True, on_status=None):
+        self.backend_factory = backend_factory
+        self.logger = logger
+        self.max_jobs = max(1, int(max_jobs))
+        self.coalesce = coalesce
+        self.on_status = on_status
+        self.backend = None
+        self.current = None
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._backend_stale = False
+        self._thread = threading.Thread(target=self._run, name="injection-worker", daemon=True)
+    
+    def start(self):
+        """启动注入线程"""
+        self._thread.start()
+    
+    def stop(self, timeout=1.0):
+        """停止注入线程，未执行的任务不再执行"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+    
+    def abort(self):
+        """中止正在执行的任务并取消所有等待中的任务，返回受影响的任务数"""
+        with self._cond:
+            cancelled = [job for _, _, job in self._queue]
+            self._queue = []
+            current = self.current
+        for job in cancelled:
+            job.control.abort()
+            self._set_status(job, STATUS_ABORTED)
+        
+        if current is not None:
+            current.control.abort()
+            return len(cancelled) + 1
+        return len(cancelled)
+    
+    def toggle_pause(self):
+        """暂停或继续正在执行的任务，返回切换后是否暂停；没有任务时返回 None"""
+        current = self.current
+        if current is None:
+            return None
+        return current.control.toggle_pause()
+    
+    def reset_backend(self):
+        """配置变化后，在下一个任务开始前重新创建注入后端"""
+        self._backend_stale = True
+    
+    @property
+    def pending(self):
+        """等待中的任务数"""
+        with self._cond:
+            return len(self._queue)
+    
+    def _set_status(self, job, status):
+        job.status = status
+        if status not in (STATUS_QUEUED, STATUS_RUNNING):
+            job.finished = time.perf_counter()
+            job.done.set()
+        if self.on_status:
+            try:
+                self.on_status(job)
+            except Exception:
+                pass
+    
+    def submit(self, job):
+        """提交任务，返回该任务（状态可能已是已丢弃）"""
+        replaced = None
+        with self._cond:
+            if self.coalesce and job.coalesce_key is not None:
+                for index, (_, _, pending) in enumerate(self._queue):
+                    if pending.coalesce_key == job.coalesce_key:
+                        replaced = pending
+                        self._queue.pop(index)
+                        heapq.heapify(self._queue)
+                        break
+            
+            accepted = len(self._queue) < self.max_jobs
+            if accepted:
+                # 入队前通知状态，避免与注入线程更新的执行中状态乱序
+                self._set_status(job, STATUS_QUEUED)
+                heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+                self._cond.notify()
+        
+        if replaced is not None:
+            self._set_status(replaced, STATUS_COALESCED)
+        if not accepted:
+            self._set_status(job, STATUS_DROPPED)
+        return job
+    
+    def _ensure_backend(self):
+        if self.backend is not None and not self._backend_stale:
+            return self.backend
+        if self.backend is not None:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
+        self._backend_stale = False
+        self.backend = self.backend_factory()
+        return self.backend
+    
+    def _run(self):
+        try:
+            # 预先创建后端，首个任务不再承担初始化开销
+            self._ensure_backend()
+        except Exception as e:
+            self.logger.error(f"注入后端初始化失败: {e}")
+        
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    break
+                _, _, job = heapq.heappop(self._queue)
+                self.current = job
+            
+            job.started = time.perf_counter()
+            self._set_status(job, STATUS_RUNNING)
+            try:
+                backend = self._ensure_backend()
+                backend.prepare()
+                job.func(job, backend)
+                self._set_status(job, STATUS_ABORTED if job.control.aborted.is_set() else STATUS_DONE)
+            except Exception as e:
+                job.error = e
+                self.logger.error(f"任务 #{job.id}（{job.name}）执行失败: {e}")
+                self._set_status(job, STATUS_FAILED)
+            finally:
+                self.current = None
+        
+        if self.backend is not None:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
@@ -0,0 +1,162 @@
+import itertools
+import threading
+import time
+from collections import deque
+from pynput import keyboard
+from scheduler import percentile
+
+# 统计分发延迟时保留的样本数
+MAX_DELAY_SAMPLES = 1000
+
+
+class InputStats:
+    """统计订阅者：记录收到的按键事件数与钩子回调到分发之间的延迟"""
+    
+    def __init__(self, hub):
+        self.hub = hub
+        self.reset()
+    
+    def reset(self):
+        self.presses = 0
+        self.releases = 0
+        self.delays = deque(maxlen=MAX_DELAY_SAMPLES)
+    
+    def on_press(self, key):
+        self.presses += 1
+        self.delays.append(time.perf_counter() - self.hub.event_time)
+    
+    def on_release(self, key):
+        self.releases += 1
+    
+    def summary(self):
+        delays = sorted(self.delays)
+        return {
+            'presses': self.presses,
+            'releases': self.releases,
+            'filtered': self.hub.filtered,
+            'dispatch_p50_ms': percentile(delays, 50) * 1000,
+            'dispatch_p95_ms': percentile(delays, 95) * 1000,
+        }
+
+
+class InputHub:
+    """进程内唯一的全局键盘钩子
+    
+    钩子线程只把事件追加到队列中，由分发线程依次交给各订阅者，订阅者的
+    处理耗时不会阻塞系统的按键事件。至少有一个 keep_alive 订阅者时才安装
+    钩子，最后一个取消订阅时卸载。event_filter(key, pressed) 返回 True 的
+    事件（如本程序注入的按键）不分发。
+    """
+    
+    def __init__(self, logger, event_filter=None, on_error=None):
+        self.logger = logger
+        self.event_filter = event_filter
+        self.on_error = on_error
+        self.filtered = 0
+        # 正在分发的事件由钩子收到的时刻
+        self.event_time = 0.0
+        # 订阅者元组在修改时整体替换，分发线程无需加锁读取
+        self._subscribers = ()
+        self._ids = itertools.count(1)
+        self._events = deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._closed = False
+        self.stats = InputStats(self)
+        self.subscribe('stats', self.stats.on_press, self.stats.on_release, keep_alive=False)
+        threading.Thread(target=self._dispatch_loop, name="input-hub", daemon=True).start()
+    
+    @property
+    def running(self):
+        """钩子是否已安装"""
+        return self._listener is not None
+    
+    def subscribe(self, name, on_press=None, on_release=None, keep_alive=True):
+        """添加订阅者，返回用于取消订阅的编号"""
+        subscription = (next(self._ids), name, on_press, on_release, keep_alive)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+            self._update_listener()
+        return subscription[0]
+    
+    def unsubscribe(self, subscription_id):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s[0] != subscription_id)
+            self._update_listener()
+    
+    def _update_listener(self):
+        """按是否存在 keep_alive 订阅者安装或卸载钩子（调用方持有锁）"""
+        needed = not self._closed and any(s[4] for s in self._subscribers)
+        if needed and self._listener is None:
+            self._listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+            self._listener.start()
+            threading.Thread(target=self._watch_listener, args=(self._listener,), daemon=True).start()
+        elif not needed and self._listener is not None:
+            listener, self._listener = self._listener, None
+            try:
+                listener.stop()
+            except Exception as e:
+                self.logger.warning(f"卸载键盘钩子时出错: {e}")
+    
+    def _watch_listener(self, listener):
+        """钩子线程在未被卸载时退出（如无法连接显示服务器），通知调用方"""
+        error = None
+        try:
+            listener.join()
+        except Exception as e:
+            error = e
+        with self._lock:
+            if self._listener is not listener:
+                return
+            self._listener = None
+        self.logger.error(f"键盘钩子已退出: {error or '未知原因'}")
+        if self.on_error:
+            self.on_error(error)
+    
+    def _on_press(self, key):
+        self._events.append((key, True, time.perf_counter()))
+        self._wakeup.set()
+    
+    def _on_release(self, key):
+        self._events.append((key, False, time.perf_counter()))
+        self._wakeup.set()
+    
+    def post(self, func):
+        """在分发线程中执行 func，与按键事件的处理严格按顺序进行"""
+        self._events.append((func, None, 0.0))
+        self._wakeup.set()
+    
+    def _dispatch_loop(self):
+        events = self._events
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while events:
+                key, pressed, event_time = events.popleft()
+                if pressed is None:
+                    try:
+                        key()
+                    except Exception as e:
+                        self.logger.error(f"按键分发线程任务错误: {e}")
+                    continue
+                if self.event_filter is not None and self.event_filter(key, pressed):
+                    self.filtered += 1
+                    continue
+                self.event_time = event_time
+                index = 2 if pressed else 3
+                for subscription in self._subscribers:
+                    callback = subscription[index]
+                    if callback is None:
+                        continue
+                    try:
+                        callback(key)
+                    except Exception as e:
+                        self.logger.error(f"按键事件处理错误（{subscription[1]}）: {e}")
+    
+    def close(self):
+        """卸载钩子并停止分发"""
+        with self._lock:
+            self._closed = True
+            self._update_listener()
+        self._wakeup.set()
@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from collections import deque
+from scheduler import percentile
+
+# 热键触发路径上依次记录的时间点
+TRIGGER = 'trigger'        # on_press 匹配到热键
+PICKUP = 'pickup'          # 注入线程开始执行任务
+CLIPBOARD = 'clipboard'    # 剪贴板内容就绪
+PLAN = 'plan'              # 按键计划就绪
+RELEASE = 'release'        # 触发热键全部松开
+FIRST_KEY = 'first_key'    # 第一个按键已发送
+DONE = 'done'              # 任务结束
+
+# 统计的阶段：(名称, 起点, 终点, 显示名称)
+STAGES = (
+    ('queue', TRIGGER, PICKUP, '排队'),
+    ('clipboard', PICKUP, CLIPBOARD, '读取剪贴板'),
+    ('plan', CLIPBOARD, PLAN, '编译计划'),
+    ('release', PLAN, RELEASE, '等待松开'),
+    ('first_key', RELEASE, FIRST_KEY, '发送首键'),
+    ('total', TRIGGER, FIRST_KEY, '触发到首键'),
+    ('typing', FIRST_KEY, DONE, '输入耗时'),
+)
+
+# 每个阶段保留的最大样本数
+MAX_SAMPLES = 1000
+
+
+class LatencyTrace:
+    """单次热键触发各时间点的记录"""
+    
+    def __init__(self):
+        self.marks = {}
+    
+    def mark(self, point, timestamp=None):
+        """记录时间点，同一时间点只记录第一次"""
+        if point not in self.marks:
+            self.marks[point] = timestamp if timestamp is not None else time.perf_counter()
+
+
+class LatencyRecorder:
+    """汇总各阶段耗时，计算分位数并导出"""
+    
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.samples = {name: deque(maxlen=max_samples) for name, _, _, _ in STAGES}
+        self.lock = threading.Lock()
+    
+    def record(self, trace):
+        """记录一次触发，缺少起点或终点的阶段不计入"""
+        marks = trace.marks
+        with self.lock:
+            for name, start, end, _ in STAGES:
+                if start in marks and end in marks:
+                    self.samples[name].append(marks[end] - marks[start])
+    
+    def summary(self):
+        """返回各阶段的样本数与 p50 / p95 / p99 / 最大值（毫秒）"""
+        result = {}
+        with self.lock:
+            for name, _, _, label in STAGES:
+                samples = sorted(self.samples[name])
+                result[name] = {
+                    'label': label,
+                    'count': len(samples),
+                    'p50_ms': percentile(samples, 50) * 1000,
+                    'p95_ms': percentile(samples, 95) * 1000,
+                    'p99_ms': percentile(samples, 99) * 1000,
+                    'max_ms': samples[-1] * 1000 if samples else 0.0,
+                }
+        return result
+    
+    def export_json(self, path):
+        """导出统计结果与原始样本（毫秒）"""
+        with self.lock:
+            samples = {name: [value * 1000 for value in values] for name, values in self.samples.items()}
+        data = {
+            'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'summary': self.summary(),
+            'samples_ms': samples,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
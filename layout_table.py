@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import Xlib.display
+except ImportError:
+    Xlib = None
+
+# 字符所需的修饰键位掩码
+SHIFT = 1
+ALTGR = 2
+
+# 核心键盘映射中各列对应的修饰键状态（第二组需切换 group，不使用）
+INDEX_MODIFIERS = {
+    0: 0,
+    1: SHIFT,
+    4: ALTGR,
+    5: SHIFT | ALTGR,
+}
+
+DEFAULT_CACHE_FILE = "layout_cache.json"
+
+# 磁盘缓存中最多保留的布局数量
+MAX_CACHED_LAYOUTS = 4
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def keysym_to_char(keysym):
+    """将 keysym 转换为字符，非字符 keysym 返回 None"""
+    if 0x20 <= keysym < 0x7f or 0xa0 <= keysym < 0x100:
+        return chr(keysym)
+    if keysym & 0xff000000 == 0x01000000:
+        return chr(keysym & 0x00ffffff)
+    return None
+
+
+def layout_fingerprint(min_keycode, mapping):
+    """根据键盘映射计算布局指纹"""
+    digest = hashlib.sha1(repr((min_keycode, mapping)).encode('ascii'))
+    return digest.hexdigest()
+
+
+def build_table(min_keycode, mapping):
+    """从核心键盘映射构建 字符 -> (keycode, 修饰键) 表"""
+    table = {}
+    for i, keysyms in enumerate(mapping):
+        keycode = min_keycode + i
+        for index, modifiers in INDEX_MODIFIERS.items():
+            if index >= len(keysyms) or not keysyms[index]:
+                continue
+            char = keysym_to_char(keysyms[index])
+            if char is None:
+                continue
+            # 同一字符优先使用需要修饰键更少的按键
+            if char in table and bin(table[char][1]).count('1') <= bin(modifiers).count('1'):
+                continue
+            table[char] = (keycode, modifiers)
+        
+        # 只定义了小写字母的按键，按 X11 约定 Shift 后输入大写字母
+        if len(keysyms) > 1 and keysyms[0] and not keysyms[1]:
+            char = keysym_to_char(keysyms[0])
+            if char is not None and char.isalpha() and char.upper() != char:
+                table.setdefault(char.upper(), (keycode, SHIFT))
+    return table
+
+
+class LayoutTable:
+    """当前键盘布局的字符到按键预编译映射表"""
+    
+    def __init__(self, fingerprint, table):
+        self.fingerprint = fingerprint
+        self.table = table
+        self.get = table.get
+    
+    def __len__(self):
+        return len(self.table)
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_cache(cache_file, fingerprint, table):
+    cache = _read_cache(cache_file)
+    cache.pop(fingerprint, None)
+    cache[fingerprint] = {char: list(value) for char, value in table.items()}
+    # 只保留最近使用的几个布局
+    while len(cache) > MAX_CACHED_LAYOUTS:
+        cache.pop(next(iter(cache)))
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except Exception as e:
+        print(f"保存键盘布局缓存失败: {e}")
+
+
+def load_layout_table(display, cache_file=DEFAULT_CACHE_FILE, exclude=()):
+    """获取当前布局的映射表，依次查找内存缓存、磁盘缓存，最后重新构建
+    
+    exclude 中的 keycode 视为未绑定（注入后端临时借用的 keycode）。
+    """
+    min_keycode = display.display.info.min_keycode
+    count = display.display.info.max_keycode - min_keycode + 1
+    mapping = [
+        () if min_keycode + i in exclude else tuple(keysyms)
+        for i, keysyms in enumerate(display.get_keyboard_mapping(min_keycode, count))
+    ]
+    fingerprint = layout_fingerprint(min_keycode, mapping)
+    
+    with _lock:
+        layout = _tables.get(fingerprint)
+        if layout is not None:
+            return layout
+        
+        cached = _read_cache(cache_file).get(fingerprint) if os.path.exists(cache_file) else None
+        if cached:
+            table = {char: tuple(value) for char, value in cached.items()}
+        else:
+            table = build_table(min_keycode, mapping)
+            _write_cache(cache_file, fingerprint, table)
+        
+        layout = LayoutTable(fingerprint, table)
+        _tables[fingerprint] = layout
+        return layout
+
+
+def preload_layout_table(cache_file=DEFAULT_CACHE_FILE):
+    """启动时预先加载当前布局的映射表，X11 不可用时返回 None"""
+    if Xlib is None:
+        return None
+    try:
+        display = Xlib.display.Display()
+    except Exception:
+        return None
+    try:
+        return load_layout_table(display, cache_file)
+    finally:
+        display.close()
@@ -0,0 +1,105 @@
+import logging
+from collections import deque
+
+# 环形缓冲区最多保留的日志记录数，界面来不及显示时丢弃最早的记录
+DEFAULT_CAPACITY = 5000
+
+# 日志区最多显示的行数
+DEFAULT_MAX_LINES = 1000
+
+# 界面线程取出日志的间隔（毫秒）
+FLUSH_INTERVAL_MS = 100
+
+
+class RingBufferHandler(logging.Handler):
+    """把日志记录追加到定长环形缓冲区，由界面线程定时批量取出
+    
+    记录日志只做一次 deque 追加，不格式化、不等待界面线程，输入线程大量
+    记录警告时也不会变慢。
+    """
+    
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        # 缓冲区已满时被挤掉的记录数
+        self.dropped = 0
+    
+    def handle(self, record):
+        # deque 的追加本身是线程安全的，不需要 Handler 的锁
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+    
+    def emit(self, record):
+        records = self.records
+        if len(records) == records.maxlen:
+            self.dropped += 1
+        records.append(record)
+    
+    def drain(self):
+        """取出当前缓冲的全部记录，返回 (记录列表, 丢弃数)"""
+        records = []
+        pop = self.records.popleft
+        try:
+            for _ in range(len(self.records)):
+                records.append(pop())
+        except IndexError:
+            pass
+        dropped, self.dropped = self.dropped, 0
+        return records, dropped
+
+
+class LogCollapser:
+    """把日志记录转换为显示行，连续重复的消息合并为一行并附带次数
+    
+    只合并内容完全相同的消息；以 % 格式参数记录的消息按模板合并（如逐个
+    字符的「无法输入字符」），显示最后一条的内容。
+    """
+    
+    def __init__(self, format_func):
+        self.format_func = format_func
+        self.reset()
+    
+    def reset(self):
+        self.last_key = None
+        self.count = 0
+    
+    def _key(self, record):
+        if record.args:
+            return (record.levelno, record.msg)
+        return (record.levelno, record.getMessage())
+    
+    def feed(self, records, dropped=0):
+        """返回 (是否替换已显示的最后一行, 显示行列表)"""
+        # [记录, 次数]，每组连续重复的记录只格式化最后一条
+        runs = []
+        replace_last = False
+        if dropped:
+            runs.append([None, dropped])
+            self.reset()
+        
+        for record in records:
+            key = self._key(record)
+            if key == self.last_key:
+                self.count += 1
+                if runs:
+                    runs[-1][0] = record
+                    runs[-1][1] = self.count
+                else:
+                    replace_last = True
+                    runs.append([record, self.count])
+            else:
+                self.last_key = key
+                self.count = 1
+                runs.append([record, 1])
+        
+        lines = []
+        for record, count in runs:
+            if record is None:
+                lines.append(f"……日志过多，已省略 {count} 条")
+            elif count > 1:
+                lines.append(f"{self.format_func(record)}（×{count}）")
+            else:
+                lines.append(self.format_func(record))
+        return replace_last, lines
@@ -1,49 +1,159 @@
 import customtkinter as ctk
-from tkinter import messagebox
-from pynput import keyboard
+from tkinter import filedialog, messagebox
 from pynput.keyboard import Key, KeyCode
-import pyperclip
 import time
 import threading
 import logging
+import multiprocessing
 from config_manager import ConfigManager
+from hotkey_matcher import HotkeyMatcher
+from typing_engine import (
+    LETTER, OTHER, SPACE, TypingEngine, compile_plan, delay_profile, plan_length, stream_plan
+)
+from calibration import CalibrationError, Calibrator
+from clipboard import create_clipboard
+from clipboard_watcher import ClipboardWatcher, DEFAULT_POLL_INTERVAL
+from config_watcher import ConfigWatcher, DEFAULT_POLL_INTERVAL as DEFAULT_CONFIG_POLL_INTERVAL
+from duration_estimator import DEFAULT_WARNING_THRESHOLD, MIN_SAMPLE_KEYS, DurationEstimator, format_duration
+from latency import (
+    CLIPBOARD, DONE, FIRST_KEY, PICKUP, PLAN, RELEASE, TRIGGER, LatencyRecorder, LatencyTrace
+)
+from injection_backends import create_backend
+from injection_journal import InjectionJournal, JournaledBackend
+from input_hub import InputHub
+from layout_table import preload_layout_table
+from log_buffer import DEFAULT_MAX_LINES, FLUSH_INTERVAL_MS, LogCollapser, RingBufferHandler
+from injection_worker import (
+    DEFAULT_QUEUE_SIZE, PRIORITY_HIGH, STATUS_ABORTED, STATUS_COALESCED, STATUS_DROPPED, STATUS_QUEUED,
+    STATUS_RUNNING,
+    InjectionJob, InjectionWorker
+)
+from paste_engine import PasteEngine, DEFAULT_CHUNK_SIZE, DEFAULT_SETTLE_TIME
+from process_engine import ProcessTypingEngine, TypingProcess
+from progress import SAMPLE_INTERVAL_MS, ProgressCounter, ProgressSampler
 
 # 设置外观模式和默认颜色主题
 ctk.set_appearance_mode("light")  # 可选: "light", "dark", "system"
 ctk.set_default_color_theme("dark-blue")  # 可选: "blue", "green", "dark-blue"
 
 class AutoInputGUI:
+    # 剪贴板预览显示的最大字符数
+    PREVIEW_CHARS = 200
+    
     def __init__(self):
         self.root = ctk.CTk()
         self.root.title("自动输入工具")
         self.root.geometry("900x750")
         
+        # 配置日志：先于加载配置，启动时的配置错误也显示在日志区
+        self.setup_logging()
+        
         # 配置管理器
-        self.config_manager = ConfigManager()
+        self.config_manager = ConfigManager(logger=self.logger)
         self.config = self.config_manager.load_config()
         
         # 全局变量
-        self.hotkey_pressed = threading.Event()
+        self.last_trigger_time = 0.0
         self.current_keys = set()
-        self.listener = None
+        self.hotkey_subscription = None
+        self.control_subscription = None
         self.is_listening = False
         
         # 从配置加载热键
         self.hotkeys = self.config_manager.hotkeys_from_config(self.config)
         self.hotkey_descriptions = [hk['description'] for hk in self.config['hotkeys']]
         
+        # 输入过程中生效的中止与暂停/继续热键
+        self.abort_keys = self.config_manager.keys_from_config(self.config.get('abort_hotkey', ['esc']))
+        self.pause_keys = self.config_manager.keys_from_config(self.config.get('pause_hotkey', ['f8']))
+        self.control_matcher = HotkeyMatcher([self.abort_keys, self.pause_keys])
+        
         # 防抖时间
         self.debounce_time = self.config.get('debounce_time', 0.5)
         
+        # 等待触发热键松开的任务：[(按键集合, 事件)]，由监听线程在全部松开时置位
+        self.release_waits = []
+        
+        # 热键触发到首个按键的各阶段耗时统计
+        self.latency = LatencyRecorder()
+        
+        # 输入引擎写入的进度计数器，界面定时读取
+        self.progress = ProgressCounter()
+        self.progress_sampler = ProgressSampler(self.progress)
+        
+        # 输入耗时估算，按每次输入的实际耗时修正
+        self.estimator = DurationEstimator()
+        self.preview_content = ""
+        # 预览只读取了剪贴板开头的部分内容
+        self.preview_truncated = False
+        self.clipboard_estimate = None
+        
+        # 记录本程序注入的按键，监听器据此忽略自己发送的事件
+        self.journal = InjectionJournal()
+        
+        # 有任务等待或运行中的数量，期间订阅中止与暂停热键
+        self.active_jobs = 0
+        self.active_jobs_lock = threading.Lock()
+        
         # 快捷键设置窗口引用
         self.hotkey_settings_window = None
         
-        # 配置日志
-        self.setup_logging()
+        # XTest 后端需要键盘布局映射表，启动时在后台预先加载
+        if self.config.get('injection_backend', 'pynput').startswith('xtest'):
+            threading.Thread(target=preload_layout_table, daemon=True).start()
+        
+        # 全局键盘钩子只安装一个，热键、录制、中止热键等都通过它订阅按键事件
+        self.hub = InputHub(
+            self.logger,
+            event_filter=self.journal.is_injected,
+            on_error=lambda e: self.root.after(0, self.stop_listening)
+        )
+        
+        # 进程内读取剪贴板，避免每次触发都启动 xclip / xsel 子进程
+        self.clipboard = create_clipboard(self.config, self.root, self.logger)
+        
+        # 后台保持剪贴板快照与预编译的按键计划，热键触发时无需再读取剪贴板
+        self.clipboard_watcher = None
+        if self.config.get('clipboard_watch', True):
+            self.clipboard_watcher = ClipboardWatcher(
+                self.clipboard,
+                self._watch_profile,
+                self.logger,
+                on_change=lambda snapshot: self.root.after(0, self._show_clipboard_preview, snapshot.text),
+                poll_interval=self.config.get('clipboard_poll_interval', DEFAULT_POLL_INTERVAL)
+            )
         
         # 创建界面
         self.create_widgets()
         
+        # 常驻注入线程，持有预热的注入后端，按队列依次执行输入任务
+        self.worker = InjectionWorker(
+            lambda: JournaledBackend(create_backend(self.config, self.logger), self.journal),
+            self.logger,
+            max_jobs=self.config.get('job_queue_size', DEFAULT_QUEUE_SIZE),
+            coalesce=self.config.get('job_coalesce', True),
+            on_status=self.on_job_status
+        )
+        self.worker.start()
+        if self.clipboard_watcher is not None:
+            self.clipboard_watcher.start()
+        
+        # 可选的输入子进程，按键时序不受界面与监听线程影响；启用时在后台预先启动
+        self.typing_process = TypingProcess(self.logger)
+        if self.config.get('typing_process', False):
+            threading.Thread(target=self.typing_process.ensure, args=(self.config,), daemon=True).start()
+        
+        # 外部编辑 config.json 后自动重新加载
+        self.config_watcher = None
+        if self.config.get('config_watch', True):
+            self.config_watcher = ConfigWatcher(
+                self.config_manager,
+                lambda config: self.root.after(0, self.apply_reloaded_config, config),
+                self.logger,
+                poll_interval=self.config.get('config_poll_interval', DEFAULT_CONFIG_POLL_INTERVAL)
+            )
+            self.config_watcher.start()
+        
         # 绑定关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
@@ -52,6 +162,13 @@ class AutoInputGUI:
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         self.logger.handlers.clear()
+        
+        # 日志先写入环形缓冲区，创建界面后由界面线程按固定间隔批量显示
+        self.log_handler = RingBufferHandler()
+        formatter = logging.Formatter('%(asctime)s - %(message)s', 
+                                     datefmt='%H:%M:%S')
+        self.log_handler.setFormatter(formatter)
+        self.logger.addHandler(self.log_handler)
     
     def create_widgets(self):
         """创建界面组件"""
@@ -263,7 +380,16 @@ class AutoInputGUI:
             corner_radius=8,
             wrap="word"
         )
-        self.clipboard_text.pack(fill="x", padx=15, pady=(0, 15))
+        self.clipboard_text.pack(fill="x", padx=15, pady=(0, 5))
+        
+        self.estimate_label = ctk.CTkLabel(
+            clipboard_frame,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="gray50",
+            anchor="w"
+        )
+        self.estimate_label.pack(fill="x", padx=15, pady=(0, 10))
         
         # ========== 右侧内容 ==========
         
@@ -307,6 +433,71 @@ class AutoInputGUI:
             text_color="gray60"
         ).pack(pady=(5, 15), padx=15)
         
+        # ----- 输入进度 -----
+        progress_frame = ctk.CTkFrame(right_frame)
+        progress_frame.pack(fill="x", pady=(0, 15))
+        
+        progress_title_container = ctk.CTkFrame(progress_frame, fg_color="transparent")
+        progress_title_container.pack(fill="x", pady=(15, 10), padx=15)
+        
+        ctk.CTkLabel(
+            progress_title_container,
+            text="输入进度",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(side="left")
+        
+        self.progress_label = ctk.CTkLabel(
+            progress_title_container,
+            text="空闲",
+            font=ctk.CTkFont(size=11, family="Consolas"),
+            text_color="gray50"
+        )
+        self.progress_label.pack(side="right")
+        
+        self.progress_bar = ctk.CTkProgressBar(progress_frame)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=15, pady=(0, 8))
+        
+        # 最近一段时间的输入速率曲线（字符/秒）
+        self.rate_canvas = ctk.CTkCanvas(progress_frame, height=36, bg="white", highlightthickness=0)
+        self.rate_canvas.pack(fill="x", padx=15, pady=(0, 15))
+        self.root.after(SAMPLE_INTERVAL_MS, self.refresh_progress_panel)
+        
+        # ----- 触发延迟 -----
+        latency_frame = ctk.CTkFrame(right_frame)
+        latency_frame.pack(fill="x", pady=(0, 15))
+        
+        latency_title_container = ctk.CTkFrame(latency_frame, fg_color="transparent")
+        latency_title_container.pack(fill="x", pady=(15, 10), padx=15)
+        
+        ctk.CTkLabel(
+            latency_title_container,
+            text="触发延迟",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(side="left")
+        
+        ctk.CTkButton(
+            latency_title_container,
+            text="导出",
+            command=self.export_latency,
+            font=ctk.CTkFont(size=11),
+            width=70,
+            height=25,
+            corner_radius=5,
+            fg_color="#95a5a6",
+            hover_color="#7f8c8d"
+        ).pack(side="right")
+        
+        self.latency_label = ctk.CTkLabel(
+            latency_frame,
+            text="",
+            font=ctk.CTkFont(size=11, family="Consolas"),
+            justify="left",
+            anchor="w"
+        )
+        self.latency_label.pack(fill="x", padx=15, pady=(0, 15))
+        self.refresh_latency_panel()
+        
         # ----- 运行日志 -----
         log_frame = ctk.CTkFrame(right_frame)
         log_frame.pack(fill="both", expand=True)
@@ -340,29 +531,43 @@ class AutoInputGUI:
         )
         self.log_text.pack(fill="both", expand=True, padx=15, pady=(0, 15))
         
-        # 配置日志handler
-        handler = logging.Handler()
-        handler.emit = lambda record: self.root.after(0, 
-            lambda: self.append_log(handler.format(record)))
-        
-        formatter = logging.Formatter('%(asctime)s - %(message)s', 
-                                     datefmt='%H:%M:%S')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        # 按固定间隔取出缓冲区中的日志显示
+        self.log_collapser = LogCollapser(self.log_handler.format)
+        self.log_lines = 0
+        self.log_max_lines = self.config.get('log_max_lines', DEFAULT_MAX_LINES)
+        self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
         
         # 初始化
         self.update_clipboard_preview()
         self.logger.info("欢迎使用自动输入工具！")
         self.logger.info("点击 '启动监听' 或直接在输入区输入内容开始使用")
     
-    def append_log(self, msg):
-        """添加日志"""
-        self.log_text.insert("end", msg + "\n")
-        self.log_text.see("end")
+    def flush_log(self):
+        """取出缓冲区中的日志批量显示，超过行数上限时删除最早的行"""
+        try:
+            records, dropped = self.log_handler.drain()
+            if records or dropped:
+                replace_last, lines = self.log_collapser.feed(records, dropped)
+                if replace_last and self.log_lines:
+                    # 重复消息的次数有变化，改写已显示的最后一行
+                    self.log_text.delete("end-2l", "end-1c")
+                    self.log_lines -= 1
+                self.log_text.insert("end", "\n".join(lines) + "\n")
+                self.log_lines += len(lines)
+                
+                excess = self.log_lines - self.log_max_lines
+                if excess > 0:
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
+                    self.log_lines -= excess
+                self.log_text.see("end")
+        finally:
+            self.root.after(FLUSH_INTERVAL_MS, self.flush_log)
     
     def clear_log(self):
         """清空日志"""
         self.log_text.delete("1.0", "end")
+        self.log_lines = 0
+        self.log_collapser.reset()
         self.logger.info("日志已清空")
     
     def refresh_hotkey_display(self):
@@ -398,17 +603,125 @@ class AutoInputGUI:
         
         self.hotkey_settings_window = HotkeySettingsWindow(self)
     
+    def _show_clipboard_preview(self, content, truncated=False):
+        """显示剪贴板内容预览，truncated 表示 content 只是剪贴板开头的部分内容"""
+        self.clipboard_text.delete("1.0", "end")
+        limit = self.PREVIEW_CHARS
+        preview = content[:limit] + ('...' if truncated or len(content) > limit else '')
+        self.clipboard_text.insert("1.0", preview)
+        self.preview_content = content
+        self.preview_truncated = truncated
+        self.refresh_estimate()
+    
+    def refresh_estimate(self):
+        """按当前配置与修正系数刷新剪贴板内容的预计耗时"""
+        content = self.preview_content
+        if not content or self.preview_truncated:
+            self.clipboard_estimate = None
+            text = "内容较长，开始输入时再估算耗时" if self.preview_truncated else ""
+            self.estimate_label.configure(text=text, text_color="gray50")
+            return
+        seconds, corrected = self.estimator.estimate(content, self.config)
+        self.clipboard_estimate = seconds
+        text = f"共 {len(content)} 个字符，预计耗时{format_duration(seconds)}"
+        if corrected:
+            text += "（已按实际速率修正）"
+        threshold = self.config.get('duration_warning_threshold', DEFAULT_WARNING_THRESHOLD)
+        if seconds > threshold:
+            self.estimate_label.configure(text=f"⚠ {text}，耗时较长", text_color="#e67e22")
+        else:
+            self.estimate_label.configure(text=text, text_color="gray50")
+    
     def update_clipboard_preview(self):
-        """更新剪贴板预览"""
+        """更新剪贴板预览
+        
+        监视剪贴板时直接使用后台快照（保留完整内容的耗时估算），否则只读取
+        剪贴板开头的部分内容，不为预览读取和复制整个剪贴板。
+        """
         try:
-            content = pyperclip.paste()
-            self.clipboard_text.delete("1.0", "end")
-            preview = content[:200] + ('...' if len(content) > 200 else '')
-            self.clipboard_text.insert("1.0", preview)
+            watcher = self.clipboard_watcher
+            snapshot = watcher.snapshot if watcher is not None else None
+            if snapshot is not None:
+                self._show_clipboard_preview(snapshot.text)
+                return
+            prefix, truncated = self.clipboard.paste_prefix(self.PREVIEW_CHARS)
+            self._show_clipboard_preview(prefix, truncated)
         except Exception as e:
             self.clipboard_text.delete("1.0", "end")
             self.clipboard_text.insert("1.0", f"无法读取剪贴板: {e}")
     
+    def refresh_progress_panel(self):
+        """定时读取进度计数器，刷新进度条、速率与剩余时间"""
+        try:
+            state = self.progress_sampler.sample()
+            if state['active']:
+                self.progress_bar.set(state['fraction'])
+                text = f"{state['offset']}/{state['total']}（{state['fraction'] * 100:.1f}%）"
+                if state['paused']:
+                    text = f"已暂停 {text}"
+                else:
+                    text += f"  {state['rate']:.0f} 字符/秒"
+                    if state['eta'] is not None:
+                        text += f"  剩余 {state['eta']:.0f} 秒"
+                self.progress_label.configure(text=text)
+            elif state['total']:
+                self.progress_bar.set(state['fraction'])
+                self.progress_label.configure(text=f"已结束 {state['offset']}/{state['total']}")
+            self.draw_rate_sparkline()
+        finally:
+            self.root.after(SAMPLE_INTERVAL_MS, self.refresh_progress_panel)
+    
+    def draw_rate_sparkline(self):
+        """绘制速率曲线，纵轴按窗口内的最大速率缩放"""
+        canvas = self.rate_canvas
+        canvas.delete("all")
+        rates = self.progress_sampler.rates
+        peak = max(rates)
+        width = canvas.winfo_width()
+        height = int(canvas.cget("height"))
+        if peak <= 0 or width <= 1:
+            return
+        step = width / (len(rates) - 1)
+        points = []
+        for i, rate in enumerate(rates):
+            points.append(i * step)
+            points.append(height - 2 - rate / peak * (height - 4))
+        canvas.create_line(*points, fill="#1f538d", width=2)
+        canvas.create_text(4, 2, text=f"{peak:.0f}/s", anchor="nw", fill="gray50", font=("Consolas", 8))
+    
+    def refresh_latency_panel(self):
+        """刷新触发延迟统计面板"""
+        summary = self.latency.summary()
+        if not summary['total']['count']:
+            self.latency_label.configure(text="尚无数据，触发一次热键后显示各阶段耗时")
+            return
+        lines = [f"{'阶段':<8}{'p50':>8}{'p95':>8}{'p99':>8}  (ms)"]
+        for stats in summary.values():
+            if not stats['count']:
+                continue
+            # 中文标签按两个字符宽度对齐
+            label = stats['label'] + ' ' * (10 - len(stats['label']) * 2)
+            lines.append(f"{label}{stats['p50_ms']:>8.1f}{stats['p95_ms']:>8.1f}{stats['p99_ms']:>8.1f}")
+        lines.append(f"共 {summary['total']['count']} 次触发")
+        self.latency_label.configure(text="\n".join(lines))
+    
+    def export_latency(self):
+        """导出触发延迟统计为 JSON"""
+        path = filedialog.asksaveasfilename(
+            title="导出触发延迟统计",
+            defaultextension=".json",
+            initialfile="latency.json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            self.latency.export_json(path)
+            self.logger.info(f"触发延迟统计已导出到 {path}")
+        except Exception as e:
+            self.logger.error(f"导出失败: {e}")
+            messagebox.showerror("错误", f"导出失败: {e}")
+    
     def copy_input_to_clipboard(self):
         """复制输入框内容到剪贴板"""
         try:
@@ -422,9 +735,9 @@ class AutoInputGUI:
                 return
             
             # 复制原始内容，保留所有换行和空格
-            pyperclip.copy(content)
+            self.clipboard.copy(content)
             self.logger.info(f"已复制到剪贴板（{len(content)} 个字符，包含所有换行）")
-            self.update_clipboard_preview()
+            self._show_clipboard_preview(content)
             
             # 统计换行数量
             line_count = content.count('\n') + 1
@@ -447,67 +760,39 @@ class AutoInputGUI:
                 return
             
             # 复制原始内容，保留所有换行和空格
-            pyperclip.copy(content)
+            self.clipboard.copy(content)
             line_count = content.count('\n') + 1
             self.logger.info(f"已复制到剪贴板（{len(content)} 个字符，{line_count} 行，包含所有换行）")
-            self.update_clipboard_preview()
+            self._show_clipboard_preview(content)
             
             self.logger.info("将在3秒后开始自动输入...")
             self.logger.info("请切换到目标窗口！")
             
-            threading.Thread(target=self._delayed_auto_input, args=(content,), daemon=True).start()
+            self.worker.submit(InjectionJob(
+                lambda job, backend: self._delayed_auto_input(content, job, backend),
+                "复制并输入",
+                estimate=self.estimator.estimate(content, self.config, 'type')[0]
+            ))
             
         except Exception as e:
             self.logger.error(f"操作失败: {e}")
             messagebox.showerror("错误", f"操作失败: {e}")
     
-    def _delayed_auto_input(self, content):
+    def _delayed_auto_input(self, content, job, backend):
         """延迟后自动输入"""
         try:
-            for i in range(3, 0, -1):
-                self.logger.info(f"倒计时: {i}秒")
-                time.sleep(1)
+            if not self._countdown(job.control):
+                return
             
             self.logger.info("===== 开始自动输入 =====")
             self.logger.info("正在输入...")
             self.logger.info("提示：如果有输入法，建议切换到英文模式以获得最佳效果")
             
-            keyboard_controller = keyboard.Controller()
             char_count = len(content)
+            self._type_content(content, backend, control=job.control)
             
-            for i, char in enumerate(content):
-                if char == '\n':
-                    keyboard_controller.press(Key.enter)
-                    keyboard_controller.release(Key.enter)
-                elif char == '\t':
-                    keyboard_controller.press(Key.tab)
-                    keyboard_controller.release(Key.tab)
-                elif char == ' ':
-                    # 空格使用 Key.space，确保正确输入
-                    keyboard_controller.press(Key.space)
-                    keyboard_controller.release(Key.space)
-                else:
-                    try:
-                        keyboard_controller.press(char)
-                        keyboard_controller.release(char)
-                    except Exception:
-                        self.logger.warning(f"无法输入字符: {repr(char)}")
-                        continue
-                
-                # 中英文混合时，增加延迟避免输入法干扰
-                base_delay = self.config.get('input_delay', 0.02)
-                if char.isascii() and char.isalpha():
-                    time.sleep(base_delay * 2.5)  # 英文字母使用基础延迟的2.5倍（默认50ms）
-                elif char == ' ':
-                    time.sleep(base_delay * 1.5)  # 空格使用基础延迟的1.5倍（默认30ms）
-                else:
-                    time.sleep(base_delay)  # 其他字符使用基础延迟（默认20ms）
-                
-                if (i + 1) % 100 == 0:
-                    progress = (i + 1) / char_count * 100
-                    self.logger.info(f"进度: {i + 1}/{char_count} ({progress:.1f}%)")
-            
-            self.logger.info(f"输入完成！共输入 {char_count} 个字符")
+            if not job.control.aborted.is_set():
+                self.logger.info(f"输入完成！共输入 {char_count} 个字符")
             self.logger.info("=========================")
             
         except Exception as e:
@@ -525,15 +810,23 @@ class AutoInputGUI:
             return
         
         self.is_listening = True
+        # 丢弃上次监听期间遗留的按住状态
+        self.current_keys.clear()
+        self.hotkeys.sync(self.current_keys)
+        self.control_matcher.sync(self.current_keys)
         self.start_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
         self.status_label.configure(text="● 监听中", text_color="#27ae60")
         
-        self.listener_thread = threading.Thread(target=self._listener_loop, daemon=True)
-        self.listener_thread.start()
+        self.hub.stats.reset()
+        self.hotkey_subscription = self.hub.subscribe('hotkeys', self.on_press, self.on_release)
         
         self.logger.info("键盘监听已启动")
         self.logger.info("请使用配置的快捷键触发自动输入")
+        self.logger.info(
+            f"输入过程中按 {self._format_keys(self.abort_keys)} 中止，"
+            f"按 {self._format_keys(self.pause_keys)} 暂停/继续"
+        )
     
     def stop_listening(self):
         """停止键盘监听"""
@@ -542,47 +835,119 @@ class AutoInputGUI:
         
         self.is_listening = False
         
-        if self.listener:
-            self.listener.stop()
+        if self.hotkey_subscription is not None:
+            self.hub.unsubscribe(self.hotkey_subscription)
+            self.hotkey_subscription = None
         
         self.start_button.configure(state="normal")
         self.stop_button.configure(state="disabled")
         self.status_label.configure(text="● 已停止", text_color="#e74c3c")
         
+        stats = self.hub.stats.summary()
         self.logger.info("键盘监听已停止")
-    
-    def _listener_loop(self):
-        """监听循环"""
-        try:
-            with keyboard.Listener(
-                on_press=self.on_press,
-                on_release=self.on_release
-            ) as listener:
-                self.listener = listener
-                listener.join()
-        except Exception as e:
-            self.logger.error(f"监听线程错误: {e}")
-            self.root.after(0, self.stop_listening)
+        self.logger.info(
+            f"本次监听收到 {stats['presses']} 次按键，"
+            f"分发延迟 p95: {stats['dispatch_p95_ms']:.2f}ms"
+        )
     
     def on_press(self, key):
         """监听按键按下"""
         if not self.is_listening:
             return
         
+        # 按住不放产生的自动重复按下不再触发
+        if key in self.current_keys:
+            return
         self.current_keys.add(key)
         
-        if not self.hotkey_pressed.is_set():
-            for combo in self.hotkeys:
-                if combo.issubset(self.current_keys):
-                    self.logger.info(f"触发热键: {self._format_keys(combo)}")
-                    self.hotkey_pressed.set()
-                    threading.Thread(target=self.handle_hotkey, daemon=True).start()
-                    break
+        index = self.hotkeys.press(key)
+        if index is None:
+            return
+        
+        now = time.monotonic()
+        if now - self.last_trigger_time < self.debounce_time:
+            return
+        self.last_trigger_time = now
+        trace = LatencyTrace()
+        trace.mark(TRIGGER)
+        combo = self.hotkeys[index]
+        self.logger.info(f"触发热键: {self._format_keys(combo)}")
+        released = threading.Event()
+        self.release_waits.append((combo, released))
+        # 连续触发时只保留最新的一个等待任务
+        self.worker.submit(InjectionJob(
+            lambda job, backend: self.handle_hotkey(job, backend, released, trace),
+            "热键输入", PRIORITY_HIGH, coalesce_key='hotkey',
+            estimate=self.clipboard_estimate if self.clipboard_watcher is not None else None
+        ))
     
     def on_release(self, key):
         """监听按键释放"""
         if key in self.current_keys:
             self.current_keys.discard(key)
+        self.hotkeys.release(key)
+        
+        # 触发热键的所有按键都已松开时通知对应任务开始输入
+        if self.release_waits:
+            waiting = []
+            for combo, released in self.release_waits:
+                if combo.isdisjoint(self.current_keys):
+                    released.set()
+                else:
+                    waiting.append((combo, released))
+            self.release_waits = waiting
+    
+    def on_control_press(self, key):
+        """中止（0）与暂停（1）热键，只在有任务等待或运行时订阅"""
+        control = self.control_matcher.press(key)
+        if control == 0 and self.worker.abort():
+            self.logger.info("已按下中止热键，停止输入")
+        elif control == 1:
+            self.worker.toggle_pause()
+    
+    def on_control_release(self, key):
+        """中止与暂停热键的按键释放"""
+        self.control_matcher.release(key)
+    
+    def apply_hotkey_config(self):
+        """按当前配置重新编译热键，在按键分发线程中整体替换，监听不中断"""
+        hotkeys = self.config_manager.hotkeys_from_config(self.config)
+        abort_keys = self.config_manager.keys_from_config(self.config.get('abort_hotkey', ['esc']))
+        pause_keys = self.config_manager.keys_from_config(self.config.get('pause_hotkey', ['f8']))
+        control_matcher = HotkeyMatcher([abort_keys, pause_keys])
+        self.hotkey_descriptions = [hk['description'] for hk in self.config['hotkeys']]
+        self.debounce_time = self.config.get('debounce_time', 0.5)
+        
+        def install():
+            # 沿用当前的按住状态，替换后正在按住的组合仍能正确匹配
+            hotkeys.sync(self.current_keys)
+            control_matcher.sync(self.current_keys)
+            self.hotkeys = hotkeys
+            self.abort_keys, self.pause_keys = abort_keys, pause_keys
+            self.control_matcher = control_matcher
+        
+        self.hub.post(install)
+    
+    def apply_reloaded_config(self, config):
+        """应用从修改后的配置文件重新加载的配置"""
+        self.config = config
+        self.apply_hotkey_config()
+        self.worker.reset_backend()
+        self.refresh_hotkey_display()
+        self.logger.info("配置文件已修改，新配置已生效（剪贴板与任务队列相关配置需重启程序）")
+    
+    def _track_active_job(self, delta):
+        """维护等待或运行中的任务数，从无到有时订阅中止与暂停热键，全部结束后取消"""
+        with self.active_jobs_lock:
+            self.active_jobs += delta
+            if self.active_jobs > 0 and self.control_subscription is None:
+                self.control_matcher.sync(())
+                self.control_subscription = self.hub.subscribe(
+                    'control', self.on_control_press, self.on_control_release
+                )
+            elif self.active_jobs == 0 and self.control_subscription is not None:
+                self.hub.unsubscribe(self.control_subscription)
+                self.control_subscription = None
     
     def _format_keys(self, keys):
         """格式化按键显示"""
@@ -594,12 +959,118 @@ class AutoInputGUI:
                 key_names.append(str(key).replace('Key.', '').title())
         return ' + '.join(sorted(key_names))
     
-    def handle_hotkey(self):
-        """处理热键触发"""
+    def on_job_status(self, job):
+        """输入任务状态变化"""
+        if job.status == STATUS_QUEUED:
+            self._track_active_job(1)
+        elif job.status not in (STATUS_RUNNING, STATUS_DROPPED):
+            self._track_active_job(-1)
+        
+        if job.status == STATUS_QUEUED and self.worker.current is not None:
+            estimate = f"，预计耗时{format_duration(job.estimate)}" if job.estimate is not None else ""
+            self.logger.info(f"任务 #{job.id}（{job.name}）已排队，等待当前任务完成{estimate}")
+        elif job.status == STATUS_COALESCED:
+            self.logger.info(f"任务 #{job.id}（{job.name}）已合并到新的触发")
+        elif job.status == STATUS_DROPPED:
+            self.logger.warning(f"任务队列已满，已丢弃任务 #{job.id}（{job.name}）")
+        elif job.status == STATUS_ABORTED:
+            self.logger.info(f"任务 #{job.id}（{job.name}）已中止")
+    
+    def _countdown(self, control, seconds=3):
+        """开始输入前倒计时，可被暂停或中止，返回 False 表示已中止"""
+        for i in range(seconds, 0, -1):
+            self.logger.info(f"倒计时: {i}秒")
+            if not control.sleep(1) and not control.wait_resumed():
+                return False
+        return True
+    
+    def _watch_profile(self):
+        """剪贴板快照预编译按键计划使用的延迟配置，分块粘贴模式下不需要按键计划"""
+        if self.config.get('input_mode', 'type') == 'paste':
+            return None
+        return delay_profile(self.config)
+    
+    def _log_estimate(self, content, mode):
+        """输入开始前记录预计耗时，超过阈值时给出警告"""
+        seconds, corrected = self.estimator.estimate(content, self.config, mode)
+        text = f"预计耗时: {format_duration(seconds)}" + ("（已按实际速率修正）" if corrected else "")
+        threshold = self.config.get('duration_warning_threshold', DEFAULT_WARNING_THRESHOLD)
+        if seconds > threshold:
+            self.logger.warning(f"{text}，超过 {threshold:g} 秒，可按中止热键停止")
+        else:
+            self.logger.info(text)
+    
+    def _record_duration(self, mode, nominal, elapsed):
+        """记录实际耗时以修正之后的估算，并刷新预览中的预计耗时"""
+        self.estimator.record(mode, nominal, elapsed)
+        self.root.after(0, self.refresh_estimate)
+    
+    def _type_content(self, content, backend, control=None, plan=None, trace=None):
+        """执行输入，plan 为预编译或流式生成的按键计划，为 None 时按内容流式生成"""
+        if plan is None:
+            plan = stream_plan(content, delay_profile(self.config))
+        self._log_estimate(content, 'type')
+        if self.config.get('typing_process', False):
+            engine = ProcessTypingEngine(self.typing_process, self.config, self.journal, self.progress)
+        else:
+            engine = TypingEngine(self.logger, backend, progress=self.progress)
+        try:
+            return engine.run(plan, control=control, total=plan_length(content))
+        finally:
+            if trace is not None and engine.first_key_time is not None:
+                trace.mark(FIRST_KEY, engine.first_key_time)
+            stats = engine.last_stats
+            if stats is not None and stats['count'] >= MIN_SAMPLE_KEYS:
+                self._record_duration('type', stats['nominal'], stats['elapsed'])
+    
+    def _paste_content(self, content, backend, control=None, trace=None):
+        """分块粘贴内容，content 即当前剪贴板内容，完成后将其恢复"""
+        engine = PasteEngine(
+            self.logger,
+            backend,
+            chunk_size=self.config.get('paste_chunk_size', DEFAULT_CHUNK_SIZE),
+            settle_time=self.config.get('paste_settle_time', DEFAULT_SETTLE_TIME),
+            progress=self.progress
+        )
+        self._log_estimate(content, 'paste')
+        try:
+            return engine.run(content, original=content, control=control)
+        finally:
+            if trace is not None and engine.first_key_time is not None:
+                trace.mark(FIRST_KEY, engine.first_key_time)
+            if engine.last_chunks:
+                self._record_duration('paste', engine.last_chunks * engine.settle_time, engine.last_elapsed)
+    
+    def _wait_for_release(self, released):
+        """等待触发热键全部松开，避免输入的按键与仍按住的修饰键组合"""
+        if released is None or released.is_set():
+            return
+        timeout = self.config.get('release_wait_timeout', 2.0)
+        start = time.perf_counter()
+        if released.wait(timeout):
+            self.logger.info(f"快捷键已松开（等待 {(time.perf_counter() - start) * 1000:.0f}ms）")
+        else:
+            self.logger.warning(f"等待快捷键松开超过 {timeout:g} 秒，直接开始输入")
+    
+    def handle_hotkey(self, job, backend, released=None, trace=None):
+        """处理热键触发（在注入线程中执行）
+        
+        released 在触发热键全部松开时置位，读取剪贴板后等待它再开始输入；
+        trace 记录各阶段的时间点。
+        """
+        if trace is None:
+            trace = LatencyTrace()
+        trace.mark(PICKUP, job.started)
         try:
             self.logger.info("===== 开始自动输入 =====")
             
-            content = pyperclip.paste()
+            plan = None
+            if self.clipboard_watcher is not None:
+                snapshot = self.clipboard_watcher.get()
+                content, plan = snapshot.text, snapshot.plan
+            else:
+                content = self.clipboard.paste()
+            trace.mark(CLIPBOARD)
             char_count = len(content)
             self.logger.info(f"剪贴板内容长度: {char_count} 字符")
             
@@ -607,58 +1078,46 @@ class AutoInputGUI:
                 self.logger.warning("剪贴板为空，无法输入")
                 return
             
-            time.sleep(0.2)
+            paste_mode = self.config.get('input_mode', 'type') == 'paste'
+            # 在等待热键松开之前准备好按键计划（大段内容只编译第一段，其余边输入边生成）
+            if plan is None and not paste_mode:
+                plan = stream_plan(content, delay_profile(self.config))
+            trace.mark(PLAN)
+            
+            self._wait_for_release(released)
+            trace.mark(RELEASE)
+            if job.control.aborted.is_set():
+                return
+            
+            if paste_mode:
+                self.logger.info("正在分块粘贴...")
+                pasted = self._paste_content(content, backend, control=job.control, trace=trace)
+                if not job.control.aborted.is_set():
+                    self.logger.info(f"粘贴完成！共粘贴 {pasted} 个字符")
+                return
             
             self.logger.info("正在输入...")
             self.logger.info("提示：如果有输入法，建议切换到英文模式以获得最佳效果")
-            keyboard_controller = keyboard.Controller()
+            self._type_content(content, backend, control=job.control, plan=plan, trace=trace)
             
-            for i, char in enumerate(content):
-                if char == '\n':
-                    keyboard_controller.press(Key.enter)
-                    keyboard_controller.release(Key.enter)
-                elif char == '\t':
-                    keyboard_controller.press(Key.tab)
-                    keyboard_controller.release(Key.tab)
-                elif char == ' ':
-                    # 空格使用 Key.space，确保正确输入
-                    keyboard_controller.press(Key.space)
-                    keyboard_controller.release(Key.space)
-                else:
-                    try:
-                        keyboard_controller.press(char)
-                        keyboard_controller.release(char)
-                    except Exception:
-                        self.logger.warning(f"无法输入字符: {repr(char)}")
-                        continue
-                
-                # 中英文混合时，增加延迟避免输入法干扰
-                base_delay = self.config.get('input_delay', 0.02)
-                if char.isascii() and char.isalpha():
-                    time.sleep(base_delay * 2.5)  # 英文字母使用基础延迟的2.5倍（默认50ms）
-                elif char == ' ':
-                    time.sleep(base_delay * 1.5)  # 空格使用基础延迟的1.5倍（默认30ms）
-                else:
-                    time.sleep(base_delay)  # 其他字符使用基础延迟（默认20ms）
+            if not job.control.aborted.is_set():
+                self.logger.info(f"输入完成！共输入 {char_count} 个字符")
                 
-                if (i + 1) % 100 == 0:
-                    progress = (i + 1) / char_count * 100
-                    self.logger.info(f"进度: {i + 1}/{char_count} ({progress:.1f}%)")
-            
-            self.logger.info(f"输入完成！共输入 {char_count} 个字符")
-            
         except Exception as e:
             self.logger.error(f"输入过程中发生错误: {e}")
         
         finally:
-            time.sleep(self.debounce_time)
-            self.hotkey_pressed.clear()
+            trace.mark(DONE)
+            # 只统计实际发送了按键的触发
+            if FIRST_KEY in trace.marks:
+                self.latency.record(trace)
+                self.root.after(0, self.refresh_latency_panel)
             self.logger.info("=========================")
     
     def test_input(self):
         """测试输入功能"""
         try:
-            content = pyperclip.paste()
+            content = self.clipboard.paste()
             if not content:
                 messagebox.showwarning("警告", "剪贴板为空，请先复制一些文本")
                 return
@@ -666,52 +1125,44 @@ class AutoInputGUI:
             self.logger.info("开始测试输入...")
             self.logger.info("将在3秒后输入前50个字符")
             
-            for i in range(3, 0, -1):
-                self.logger.info(f"倒计时: {i}秒")
-                time.sleep(1)
+            self.worker.submit(InjectionJob(
+                lambda job, backend: self._test_input_job(content[:50], job, backend),
+                "测试输入"
+            ))
+            
+        except Exception as e:
+            self.logger.error(f"测试失败: {e}")
+            messagebox.showerror("错误", f"测试失败: {e}")
+    
+    def _test_input_job(self, test_content, job, backend):
+        """倒计时后输入测试内容（在注入线程中执行）"""
+        try:
+            if not self._countdown(job.control):
+                return
             
-            test_content = content[:50]
-            keyboard_controller = keyboard.Controller()
             self.logger.info("提示：如果有输入法，建议切换到英文模式以获得最佳效果")
+            self._type_content(test_content, backend, control=job.control)
             
-            for char in test_content:
-                if char == '\n':
-                    keyboard_controller.press(Key.enter)
-                    keyboard_controller.release(Key.enter)
-                elif char == '\t':
-                    keyboard_controller.press(Key.tab)
-                    keyboard_controller.release(Key.tab)
-                elif char == ' ':
-                    # 空格使用 Key.space
-                    keyboard_controller.press(Key.space)
-                    keyboard_controller.release(Key.space)
-                else:
-                    try:
-                        keyboard_controller.press(char)
-                        keyboard_controller.release(char)
-                    except Exception:
-                        continue
+            if not job.control.aborted.is_set():
+                self.logger.info("测试完成！")
                 
-                # 中英文混合时，增加延迟避免输入法干扰
-                base_delay = self.config.get('input_delay', 0.02)
-                if char.isascii() and char.isalpha():
-                    time.sleep(base_delay * 2.5)  # 英文字母使用基础延迟的2.5倍（默认50ms）
-                elif char == ' ':
-                    time.sleep(base_delay * 1.5)  # 空格使用基础延迟的1.5倍（默认30ms）
-                else:
-                    time.sleep(base_delay)  # 其他字符使用基础延迟（默认20ms）
-            
-            self.logger.info("测试完成！")
-            
         except Exception as e:
             self.logger.error(f"测试失败: {e}")
-            messagebox.showerror("错误", f"测试失败: {e}")
     
     def on_closing(self):
         """关闭窗口"""
         if self.is_listening:
             self.stop_listening()
         
+        self.worker.stop()
+        self.hub.close()
+        if self.clipboard_watcher is not None:
+            self.clipboard_watcher.stop()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        self.config_manager.flush()
+        self.typing_process.close()
+        self.clipboard.close()
         self.logger.info("程序已退出")
         self.root.destroy()
     
@@ -723,6 +1174,12 @@ class AutoInputGUI:
 class HotkeySettingsWindow(ctk.CTkToplevel):
     """快捷键设置窗口"""
     
+    # 输入模式配置值与显示名称
+    INPUT_MODES = {
+        'type': '逐字输入',
+        'paste': '分块粘贴',
+    }
+    
     def __init__(self, parent_app):
         super().__init__(parent_app.root)
         
@@ -733,7 +1190,7 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         # 录制状态
         self.is_recording = False
         self.recorded_keys = set()
-        self.recording_listener = None
+        self.recording_subscription = None
         self.current_editing_index = None
         
         self.create_widgets()
@@ -747,7 +1204,7 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         # 窗口居中显示
         self.update_idletasks()  # 确保窗口尺寸已计算
         window_width = 600
-        window_height = 650
+        window_height = 800
         screen_width = self.winfo_screenwidth()
         screen_height = self.winfo_screenheight()
         x = (screen_width - window_width) // 2
@@ -923,7 +1380,8 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         self.delay_entry.pack(side="left", padx=(0, 10))
         # 将秒转换为毫秒显示
         current_delay_ms = int(self.parent_app.config.get('input_delay', 0.01) * 1000)
-        self.delay_entry.insert(0, str(current_delay_ms))
+        self.initial_delay_text = str(current_delay_ms)
+        self.delay_entry.insert(0, self.initial_delay_text)
         
         ctk.CTkLabel(
             delay_frame,
@@ -932,6 +1390,124 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
             text_color="gray60"
         ).pack(side="left")
         
+        # 自动校准
+        calibrate_frame = ctk.CTkFrame(advanced_frame, fg_color="transparent")
+        calibrate_frame.pack(fill="x", padx=15, pady=5)
+        
+        ctk.CTkLabel(
+            calibrate_frame,
+            text="延迟校准:",
+            font=ctk.CTkFont(size=13),
+            width=120,
+            anchor="w"
+        ).pack(side="left", padx=(0, 10))
+        
+        ctk.CTkButton(
+            calibrate_frame,
+            text="自动校准",
+            command=self.open_calibration,
+            width=100,
+            height=28,
+            font=ctk.CTkFont(size=12),
+            fg_color="#3498db",
+            hover_color="#2980b9",
+            corner_radius=6
+        ).pack(side="left", padx=(0, 10))
+        
+        self.profile_label = ctk.CTkLabel(
+            calibrate_frame,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="gray60"
+        )
+        self.profile_label.pack(side="left")
+        self.refresh_profile_label()
+        
+        # 输入模式配置
+        mode_frame = ctk.CTkFrame(advanced_frame, fg_color="transparent")
+        mode_frame.pack(fill="x", padx=15, pady=5)
+        
+        ctk.CTkLabel(
+            mode_frame,
+            text="输入模式:",
+            font=ctk.CTkFont(size=13),
+            width=120,
+            anchor="w"
+        ).pack(side="left", padx=(0, 10))
+        
+        self.mode_menu = ctk.CTkOptionMenu(
+            mode_frame,
+            values=list(self.INPUT_MODES.values()),
+            width=100,
+            font=ctk.CTkFont(size=13)
+        )
+        self.mode_menu.pack(side="left", padx=(0, 10))
+        self.mode_menu.set(self.INPUT_MODES.get(
+            self.parent_app.config.get('input_mode', 'type'), self.INPUT_MODES['type']
+        ))
+        
+        ctk.CTkLabel(
+            mode_frame,
+            text="粘贴模式通过剪贴板分块粘贴，目标需支持 Ctrl+V",
+            font=ctk.CTkFont(size=11),
+            text_color="gray60"
+        ).pack(side="left")
+        
+        # 粘贴分块大小配置
+        chunk_frame = ctk.CTkFrame(advanced_frame, fg_color="transparent")
+        chunk_frame.pack(fill="x", padx=15, pady=5)
+        
+        ctk.CTkLabel(
+            chunk_frame,
+            text="粘贴分块 (字符):",
+            font=ctk.CTkFont(size=13),
+            width=120,
+            anchor="w"
+        ).pack(side="left", padx=(0, 10))
+        
+        self.chunk_entry = ctk.CTkEntry(
+            chunk_frame,
+            width=100,
+            font=ctk.CTkFont(size=13)
+        )
+        self.chunk_entry.pack(side="left", padx=(0, 10))
+        self.chunk_entry.insert(0, str(self.parent_app.config.get('paste_chunk_size', DEFAULT_CHUNK_SIZE)))
+        
+        ctk.CTkLabel(
+            chunk_frame,
+            text="每次粘贴的字符数 (推荐: 500-5000)",
+            font=ctk.CTkFont(size=11),
+            text_color="gray60"
+        ).pack(side="left")
+        
+        # 粘贴等待时间配置
+        settle_frame = ctk.CTkFrame(advanced_frame, fg_color="transparent")
+        settle_frame.pack(fill="x", padx=15, pady=5)
+        
+        ctk.CTkLabel(
+            settle_frame,
+            text="粘贴等待 (毫秒):",
+            font=ctk.CTkFont(size=13),
+            width=120,
+            anchor="w"
+        ).pack(side="left", padx=(0, 10))
+        
+        self.settle_entry = ctk.CTkEntry(
+            settle_frame,
+            width=100,
+            font=ctk.CTkFont(size=13)
+        )
+        self.settle_entry.pack(side="left", padx=(0, 10))
+        current_settle_ms = int(self.parent_app.config.get('paste_settle_time', DEFAULT_SETTLE_TIME) * 1000)
+        self.settle_entry.insert(0, str(current_settle_ms))
+        
+        ctk.CTkLabel(
+            settle_frame,
+            text="每块粘贴后等待目标读取的时间 (推荐: 50-300)",
+            font=ctk.CTkFont(size=11),
+            text_color="gray60"
+        ).pack(side="left")
+        
         # 底部说明
         ctk.CTkLabel(
             advanced_frame,
@@ -989,12 +1565,10 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         self.hotkey_widgets[index]['record_btn'].configure(text="按键中...")
         self.recording_label.configure(text="请按下快捷键组合... (按 ESC 取消)")
         
-        # 启动录制监听
-        self.recording_listener = keyboard.Listener(
-            on_press=self.on_record_press,
-            on_release=self.on_record_release
+        # 通过主程序的键盘钩子订阅按键事件
+        self.recording_subscription = self.parent_app.hub.subscribe(
+            'recorder', self.on_record_press, self.on_record_release
         )
-        self.recording_listener.start()
     
     def on_record_press(self, key):
         """录制按键按下"""
@@ -1030,13 +1604,10 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         
         self.is_recording = False
         
-        # 停止并清理监听器
-        if self.recording_listener:
-            try:
-                self.recording_listener.stop()
-            except Exception:
-                pass
-            self.recording_listener = None
+        # 取消录制订阅
+        if self.recording_subscription is not None:
+            self.parent_app.hub.unsubscribe(self.recording_subscription)
+            self.recording_subscription = None
         
         if not cancelled and len(self.recorded_keys) > 0:
             # 保存录制的快捷键
@@ -1075,6 +1646,25 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
         
         self.after(2000, clear_label)
     
+    def refresh_profile_label(self):
+        """刷新自动校准结果显示"""
+        profile = self.parent_app.config.get('delay_profile')
+        if profile:
+            text = "已校准: 字母 {:.1f} / 空格 {:.1f} / 其他 {:.1f} ms".format(
+                profile.get(LETTER, 0) * 1000,
+                profile.get(SPACE, 0) * 1000,
+                profile.get(OTHER, 0) * 1000
+            )
+        else:
+            text = "未校准，按输入延迟的固定倍率计算"
+        self.profile_label.configure(text=text)
+    
+    def open_calibration(self):
+        """打开自动校准窗口"""
+        if self.is_recording:
+            self.stop_recording(cancelled=True)
+        CalibrationWindow(self)
+    
     def add_new_hotkey(self):
         """添加新快捷键"""
         new_hotkey = {
@@ -1126,32 +1716,52 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
                 return
             # 将毫秒转换为秒保存
             self.parent_app.config['input_delay'] = delay_ms / 1000
+            # 手动修改了输入延迟时，以新的延迟为准，清除自动校准结果
+            if self.delay_entry.get().strip() != self.initial_delay_text:
+                self.parent_app.config.pop('delay_profile', None)
         except ValueError:
             self.recording_label.configure(text="错误: 输入延迟必须是有效的数字")
             return
         
+        # 验证并保存粘贴分块大小
+        try:
+            chunk_size = int(self.chunk_entry.get())
+            if chunk_size < 1 or chunk_size > 100000:
+                self.recording_label.configure(text="错误: 粘贴分块必须在 1-100000 字符之间")
+                return
+        except ValueError:
+            self.recording_label.configure(text="错误: 粘贴分块必须是有效的整数")
+            return
+        
+        # 验证并保存粘贴等待时间
+        try:
+            settle_ms = float(self.settle_entry.get())
+            if settle_ms < 0 or settle_ms > 5000:
+                self.recording_label.configure(text="错误: 粘贴等待必须在 0-5000 毫秒之间")
+                return
+        except ValueError:
+            self.recording_label.configure(text="错误: 粘贴等待必须是有效的数字")
+            return
+        
+        self.parent_app.config['paste_chunk_size'] = chunk_size
+        self.parent_app.config['paste_settle_time'] = settle_ms / 1000
+        mode_names = {name: mode for mode, name in self.INPUT_MODES.items()}
+        self.parent_app.config['input_mode'] = mode_names.get(self.mode_menu.get(), 'type')
+        
         # 保存配置
         if self.parent_app.config_manager.save_config(self.parent_app.config):
-            # 重新加载热键
-            self.parent_app.hotkeys = self.parent_app.config_manager.hotkeys_from_config(
-                self.parent_app.config
-            )
-            self.parent_app.hotkey_descriptions = [
-                hk['description'] for hk in self.parent_app.config['hotkeys']
-            ]
+            # 重新编译热键并立即生效，同时更新防抖时间
+            self.parent_app.apply_hotkey_config()
             
-            # 更新防抖时间和输入延迟
-            self.parent_app.debounce_time = self.parent_app.config.get('debounce_time', 0.5)
+            # 注入后端相关配置可能已变化，下一个任务前重新创建
+            self.parent_app.worker.reset_backend()
             
             # 刷新主窗口显示
             self.parent_app.refresh_hotkey_display()
             
-            # 如果正在监听，重启监听
             if self.parent_app.is_listening:
-                self.parent_app.logger.info("快捷键已更新，请重新启动监听使其生效")
-                messagebox.showinfo("提示", "快捷键已更新！\n请重新启动监听使其生效。")
-            else:
-                messagebox.showinfo("成功", "快捷键设置已保存！")
+                self.parent_app.logger.info("快捷键已更新，立即生效")
+            messagebox.showinfo("成功", "快捷键设置已保存！")
             
             # 清理监听器后关闭窗口
             self.cleanup_and_close()
@@ -1170,15 +1780,10 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
     def cleanup_and_close(self):
         """清理资源并关闭窗口"""
         try:
-            # 确保停止录制监听器
-            if self.recording_listener is not None:
-                try:
-                    self.recording_listener.stop()
-                    self.parent_app.logger.info("已停止快捷键录制监听器")
-                except Exception as e:
-                    self.parent_app.logger.warning(f"停止监听器时出错: {e}")
-                finally:
-                    self.recording_listener = None
+            # 确保取消录制订阅
+            if self.recording_subscription is not None:
+                self.parent_app.hub.unsubscribe(self.recording_subscription)
+                self.recording_subscription = None
             
             # 清理录制状态
             self.is_recording = False
@@ -1209,8 +1814,231 @@ class HotkeySettingsWindow(ctk.CTkToplevel):
                 pass
 
 
+class CalibrationWindow(ctk.CTkToplevel):
+    """输入延迟自动校准窗口"""
+    
+    # 探测文本输入完成后等待按键事件全部到达的时间（秒）
+    SETTLE_TIME = 0.3
+    
+    def __init__(self, settings_window):
+        super().__init__(settings_window)
+        
+        self.settings_window = settings_window
+        self.parent_app = settings_window.parent_app
+        self.title("自动校准")
+        self.geometry("520x420")
+        
+        self.running = False
+        self.cancelled = False
+        self.engine = None
+        
+        self.create_widgets()
+        
+        self.protocol("WM_DELETE_WINDOW", self.on_window_close)
+        self.transient(settings_window)
+        self.attributes('-topmost', True)
+        self.after(10, self._ensure_on_top)
+    
+    def _ensure_on_top(self):
+        """确保窗口在最上层"""
+        try:
+            self.lift()
+            self.focus_force()
+            self.grab_set()
+        except Exception:
+            pass
+    
+    def create_widgets(self):
+        """创建窗口组件"""
+        ctk.CTkLabel(
+            self,
+            text="自动校准",
+            font=ctk.CTkFont(size=20, weight="bold")
+        ).pack(pady=(20, 10))
+        
+        ctk.CTkLabel(
+            self,
+            text="程序会向下方验证区输入探测文本，为字母、空格和其他字符\n"
+                 "分别找出不丢字的最小延迟。校准期间请不要操作键盘和鼠标。",
+            font=ctk.CTkFont(size=12),
+            text_color="gray60"
+        ).pack(pady=(0, 10))
+        
+        self.verify_text = ctk.CTkTextbox(
+            self,
+            height=120,
+            font=ctk.CTkFont(size=12, family="Consolas"),
+            corner_radius=8,
+            wrap="char"
+        )
+        self.verify_text.pack(fill="x", padx=20, pady=(0, 10))
+        
+        self.status_label = ctk.CTkLabel(
+            self,
+            text="点击 '开始校准' 开始",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            text_color="#e67e22"
+        )
+        self.status_label.pack(pady=10)
+        
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.pack(fill="x", padx=20, pady=(10, 20))
+        
+        self.start_button = ctk.CTkButton(
+            button_frame,
+            text="开始校准",
+            command=self.start_calibration,
+            height=45,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#27ae60",
+            hover_color="#229954",
+            corner_radius=8
+        )
+        self.start_button.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        ctk.CTkButton(
+            button_frame,
+            text="关闭",
+            command=self.on_window_close,
+            height=45,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#7f8c8d",
+            hover_color="#95a5a6",
+            corner_radius=8
+        ).pack(side="right", fill="x", expand=True, padx=(10, 0))
+    
+    def set_status(self, text):
+        """在界面线程中更新状态提示"""
+        def update():
+            try:
+                if self.winfo_exists():
+                    self.status_label.configure(text=text)
+            except Exception:
+                pass
+        
+        self.after(0, update)
+    
+    def start_calibration(self):
+        """开始校准"""
+        if self.running:
+            return
+        
+        self.running = True
+        self.cancelled = False
+        self.start_button.configure(state="disabled")
+        self.status_label.configure(text="正在校准...")
+        threading.Thread(target=self._calibration_worker, daemon=True).start()
+    
+    def _call_in_ui(self, func):
+        """在界面线程中执行 func 并等待结果"""
+        result = {}
+        done = threading.Event()
+        
+        def run():
+            try:
+                result['value'] = func()
+            except Exception as e:
+                result['error'] = e
+            finally:
+                done.set()
+        
+        self.after(0, run)
+        if not done.wait(5):
+            raise CalibrationError("界面无响应")
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+    
+    def _prepare_verify(self):
+        """清空验证区并获取键盘焦点"""
+        self.verify_text.delete("1.0", "end")
+        self.focus_force()
+        self.verify_text.focus_set()
+    
+    def _type_and_read(self, text, profile):
+        """向验证区输入探测文本并读回实际收到的内容"""
+        self._call_in_ui(self._prepare_verify)
+        time.sleep(0.1)
+        self.engine.run(compile_plan(text, profile))
+        time.sleep(self.SETTLE_TIME)
+        return self._call_in_ui(lambda: self.verify_text.get("1.0", "end-1c"))
+    
+    def _calibration_worker(self):
+        """后台执行校准"""
+        # 校准过程的输入统计不写入运行日志
+        quiet_logger = logging.getLogger(f"{__name__}.calibration")
+        quiet_logger.propagate = False
+        if not quiet_logger.handlers:
+            quiet_logger.addHandler(logging.NullHandler())
+        
+        backend = JournaledBackend(
+            create_backend(self.parent_app.config, self.parent_app.logger), self.parent_app.journal
+        )
+        try:
+            self.engine = TypingEngine(quiet_logger, backend)
+            calibrator = Calibrator(
+                self._type_and_read,
+                on_progress=self.set_status,
+                should_stop=lambda: self.cancelled
+            )
+            profile = calibrator.run()
+            self.after(0, lambda: self._finish(profile))
+        except Exception as e:
+            if not self.cancelled:
+                self.parent_app.logger.error(f"自动校准失败: {e}")
+                self.set_status(f"校准失败: {e}")
+        finally:
+            backend.close()
+            self.running = False
+            try:
+                self.after(0, lambda: self.start_button.configure(state="normal"))
+            except Exception:
+                pass
+    
+    def _finish(self, profile):
+        """保存校准结果"""
+        config = self.parent_app.config
+        config['delay_profile'] = profile
+        # 在后台写入配置文件，保存失败时记录到日志
+        self.parent_app.config_manager.save_config_later(config)
+        self.parent_app.logger.info(
+            "自动校准完成: 字母 {:.1f}ms，空格 {:.1f}ms，其他 {:.1f}ms".format(
+                profile[LETTER] * 1000, profile[SPACE] * 1000, profile[OTHER] * 1000
+            )
+        )
+        self.status_label.configure(text="校准完成，结果已保存到配置文件")
+        
+        try:
+            if self.settings_window.winfo_exists():
+                self.settings_window.refresh_profile_label()
+        except Exception:
+            pass
+    
+    def on_window_close(self):
+        """窗口关闭事件处理"""
+        self.cancelled = True
+        try:
+            self.grab_release()
+        except Exception:
+            pass
+        try:
+            if self.winfo_exists():
+                self.destroy()
+        except Exception:
+            pass
+        # 将模态状态交还给设置窗口
+        try:
+            if self.settings_window.winfo_exists():
+                self.settings_window.grab_set()
+                self.settings_window.focus_force()
+        except Exception:
+            pass
+
+
 def main():
     """主函数"""
+    # 打包后的程序启动输入子进程时需要
+    multiprocessing.freeze_support()
     app = AutoInputGUI()
     app.run()
 
@@ -0,0 +1,96 @@
+import sys
+import time
+import pyperclip
+from pynput.keyboard import Key
+from injection_backends import PynputBackend
+from progress import ProgressCounter
+
+# 粘贴快捷键的修饰键（macOS 使用 Cmd + V）
+PASTE_MODIFIER = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+
+# 默认每块字符数与每次粘贴后的等待时间（秒）
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_SETTLE_TIME = 0.1
+
+
+def split_chunks(content, chunk_size):
+    """按固定字符数切分内容"""
+    return [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+class PasteEngine:
+    """剪贴板分块粘贴引擎"""
+    
+    def __init__(self, logger, controller=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, settle_time=DEFAULT_SETTLE_TIME, progress=None):
+        self.logger = logger
+        # controller 为注入后端，需提供 press / release / finish
+        self.controller = controller if controller is not None else PynputBackend()
+        self.chunk_size = max(1, int(chunk_size))
+        self.settle_time = settle_time
+        # 进度计数器（按字符计），界面线程定时读取
+        self.progress = progress if progress is not None else ProgressCounter()
+        # 第一次粘贴快捷键发送完成的时刻（perf_counter）
+        self.first_key_time = None
+        # 上一次运行粘贴的块数与耗时（秒，不含暂停时间）
+        self.last_chunks = 0
+        self.last_elapsed = 0.0
+    
+    def run(self, content, original=None, control=None):
+        """分块粘贴内容，完成后恢复原剪贴板，返回粘贴的字符数
+        
+        control 为 RunControl 时可在两块之间中止或暂停。
+        """
+        if original is None:
+            try:
+                original = pyperclip.paste()
+            except Exception as e:
+                self.logger.warning(f"读取原剪贴板失败，输入完成后将无法恢复: {e}")
+        
+        chunks = split_chunks(content, self.chunk_size)
+        pasted = 0
+        self.first_key_time = None
+        self.last_chunks = 0
+        self.progress.begin(len(content))
+        start = time.perf_counter()
+        paused_time = 0.0
+        try:
+            for i, chunk in enumerate(chunks, 1):
+                pyperclip.copy(chunk)
+                self.controller.press(PASTE_MODIFIER)
+                try:
+                    self.controller.press('v')
+                    self.controller.release('v')
+                finally:
+                    self.controller.release(PASTE_MODIFIER)
+                    self.controller.finish()
+                if self.first_key_time is None:
+                    self.first_key_time = time.perf_counter()
+                pasted += len(chunk)
+                self.last_chunks = i
+                self.progress.offset = pasted
+                
+                # 等待目标应用读取剪贴板后再放入下一块
+                if control is None or control.sleep(self.settle_time):
+                    continue
+                # 被打断时仍需等目标应用读完本块，之后才能替换或恢复剪贴板
+                time.sleep(self.settle_time)
+                if control.paused:
+                    self.progress.paused = True
+                    self.logger.info(f"已暂停（第 {i}/{len(chunks)} 块），再次按暂停热键继续")
+                paused_since = time.perf_counter()
+                if not control.wait_resumed():
+                    self.logger.info(f"粘贴已中止（{i}/{len(chunks)} 块）")
+                    break
+                paused_time += time.perf_counter() - paused_since
+                self.progress.paused = False
+        finally:
+            self.last_elapsed = time.perf_counter() - start - paused_time
+            self.progress.end()
+            if original is not None:
+                try:
+                    pyperclip.copy(original)
+                except Exception as e:
+                    self.logger.warning(f"恢复剪贴板失败: {e}")
+        
+        return pasted
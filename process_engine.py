@@ -0,0 +1,367 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from injection_backends import create_backend
+from progress import ProgressCounter
+from scheduler import RunControl
+from typing_engine import TypingEngine
+
+# 按键计划每批发送的条目数
+PLAN_BATCH_SIZE = 4096
+
+# 父进程同步进度、转发中止与暂停的间隔（秒）
+POLL_INTERVAL = 0.005
+
+# 提前写入注入日志的按键：按计划延迟计算的时长（秒）与最少按键数
+JOURNAL_LOOKAHEAD_TIME = 0.3
+JOURNAL_LOOKAHEAD_KEYS = 16
+
+# 影响子进程中注入后端的配置项，变化时重新启动子进程
+BACKEND_KEYS = ('injection_backend', 'xtest_batch_size', 'remap_cache_size')
+
+# 等待子进程退出的最长时间（秒）
+CLOSE_TIMEOUT = 1.0
+
+
+class ProcessEngineError(Exception):
+    """输入子进程异常退出或执行失败"""
+
+
+class SharedOffsetCounter(ProgressCounter):
+    """offset 保存在共享内存中的进度计数器，由子进程中的输入引擎写入"""
+    
+    def __init__(self, shared):
+        self._shared = shared
+        super().__init__()
+    
+    @property
+    def offset(self):
+        return self._shared.value
+    
+    @offset.setter
+    def offset(self, value):
+        self._shared.value = value
+
+
+class PipeLogHandler(logging.Handler):
+    """把子进程的日志通过管道发回父进程"""
+    
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+    
+    def emit(self, record):
+        # 保留 % 格式模板与参数，父进程的日志区可按模板合并重复的警告
+        try:
+            if not isinstance(record.args, tuple):
+                raise TypeError("只转发位置参数")
+            self.conn.send(('log', record.levelno, record.msg, record.args))
+        except Exception:
+            try:
+                self.conn.send(('log', record.levelno, record.getMessage(), ()))
+            except Exception:
+                pass
+
+
+def _receive_plan(conn):
+    """逐批接收按键计划，收到结束标记 None 时结束"""
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            return
+        yield from batch
+
+
+def _child_main(conn, config, offset, events):
+    """子进程入口：创建注入后端，逐个执行父进程发来的按键计划"""
+    logger = logging.getLogger('typing_process')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(PipeLogHandler(conn))
+    
+    backend = create_backend(config, logger)
+    engine = TypingEngine(logger, backend, progress=SharedOffsetCounter(offset))
+    control = RunControl(events)
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'close':
+                break
+            _, total, start = message
+            plan = _receive_plan(conn)
+            try:
+                backend.prepare()
+                typed = engine.run(plan, control=control, start=start, total=total)
+                conn.send(('done', typed, engine.first_key_time, engine.last_stats))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+            finally:
+                # 中止时丢弃尚未输入的部分，直到结束标记
+                for _ in plan:
+                    pass
+    except EOFError:
+        pass
+    finally:
+        backend.close()
+
+
+class TypingProcess:
+    """常驻的输入子进程
+    
+    子进程拥有独立的解释器与 GIL，界面重绘、日志和键盘监听都不会打断按键
+    之间的等待。子进程在第一次输入时启动，之后复用；注入后端相关配置
+    变化时重新启动。
+    """
+    
+    def __init__(self, logger):
+        self.logger = logger
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._backend_config = None
+        self._lock = threading.Lock()
+        # 子进程写入的已处理按键数
+        self._offset = self._context.RawValue('q', 0)
+        # 与子进程共享的中止 / 暂停事件
+        self._events = (self._context.Event(), self._context.Event(), self._context.Event())
+        self.control = RunControl(self._events)
+    
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+    
+    def ensure(self, config):
+        """确保子进程以当前的注入后端配置运行"""
+        backend_config = {key: config[key] for key in BACKEND_KEYS if key in config}
+        with self._lock:
+            if self.alive and backend_config == self._backend_config:
+                return
+            self._close()
+            self._start(backend_config)
+    
+    def _start(self, backend_config):
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_child_main,
+            args=(child_conn, backend_config, self._offset, self._events),
+            name="typing-process",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._backend_config = backend_config
+        self.logger.info(f"输入子进程已启动（PID {self._process.pid}）")
+    
+    def close(self):
+        """通知子进程退出，超时则强制结束"""
+        with self._lock:
+            self._close()
+    
+    def _close(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(('close',))
+        except Exception:
+            pass
+        self._process.join(CLOSE_TIMEOUT)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(CLOSE_TIMEOUT)
+        self._conn.close()
+        self._process = None
+        self._conn = None
+    
+    def run(self, plan, control, start, progress, journal=None, total=None):
+        """在子进程中执行按键计划，返回 (输入的按键数, 首键时刻, 统计)
+        
+        plan 为列表或按顺序产生条目的迭代器（此时由 total 给出条目总数），
+        由发送线程分批写入管道，子进程边接收边输入。control 为父进程中的
+        RunControl，其中止与暂停状态会转发给子进程；子进程的进度同步到
+        progress。journal 不为 None 时，按进度提前把即将发送的按键写入注入
+        日志，让键盘监听忽略子进程注入的按键。
+        """
+        conn = self._conn
+        if total is None:
+            total = len(plan)
+        self.control.reset()
+        self._offset.value = start
+        progress.begin(total, start)
+        
+        strokes = iter(plan)
+        batches = iter(lambda: list(itertools.islice(strokes, PLAN_BATCH_SIZE)), [])
+        # 已发送、尚未写入注入日志的批次
+        upcoming = deque()
+        stop_sending = threading.Event()
+        
+        def send_plan():
+            try:
+                for batch in batches:
+                    if stop_sending.is_set():
+                        break
+                    upcoming.append(batch)
+                    conn.send(batch)
+                conn.send(None)
+            except (OSError, EOFError, ValueError):
+                pass
+        
+        journal_feed = JournalFeed(journal, upcoming, start) if journal is not None else None
+        sender = threading.Thread(target=send_plan, name="typing-plan-sender", daemon=True)
+        try:
+            # 第一批在发出输入命令前写入注入日志
+            first = next(batches, [])
+            upcoming.append(first)
+            if journal_feed is not None:
+                journal_feed.advance(start, 0)
+            conn.send(('run', total, start))
+            conn.send(first)
+            sender.start()
+            
+            last_offset = start
+            paused_at = 0.0
+            while True:
+                offset = self._offset.value
+                progress.offset = offset
+                if journal_feed is not None:
+                    journal_feed.advance(offset, offset - last_offset)
+                last_offset = offset
+                
+                if control is not None:
+                    if control.aborted.is_set():
+                        self.control.abort()
+                    elif control.paused != self.control.paused:
+                        self.control.toggle_pause()
+                        progress.paused = self.control.paused
+                        if self.control.paused:
+                            paused_at = time.perf_counter()
+                        elif journal_feed is not None:
+                            journal_feed.resume(time.perf_counter() - paused_at)
+                
+                if not conn.poll(POLL_INTERVAL):
+                    if not self.alive:
+                        raise ProcessEngineError("输入子进程已退出")
+                    continue
+                message = conn.recv()
+                if message[0] == 'log':
+                    self.logger.log(message[1], message[2], *message[3])
+                elif message[0] == 'done':
+                    progress.offset = self._offset.value
+                    return message[1], message[2], message[3]
+                else:
+                    raise ProcessEngineError(message[1])
+        except (EOFError, OSError) as e:
+            self.close()
+            raise ProcessEngineError(f"与输入子进程的连接中断: {e}") from e
+        finally:
+            stop_sending.set()
+            if sender.is_alive():
+                sender.join(CLOSE_TIMEOUT)
+            progress.end()
+
+
+class JournalFeed:
+    """按子进程的进度，把即将发送的按键提前写入注入日志
+    
+    每个按键以按计划延迟推算出的预计发送时刻记入日志，单个按键的延迟超过
+    日志的过期时间时，条目也不会在按键发送前过期。提前量按计划延迟不超过
+    JOURNAL_LOOKAHEAD_TIME，按键数不超过最少按键数加上两倍的单次进度增量。
+    """
+    
+    def __init__(self, journal, upcoming, start):
+        self.journal = journal
+        self.upcoming = upcoming
+        self.batch = []
+        self.index = 0
+        # 下一个要写入日志的按键下标，跳过 start 之前不会发送的按键
+        self.journaled = 0
+        self.skip = start
+        # 已写入日志、尚未发送的按键及其延迟之和
+        self.pending = deque()
+        self.ahead = 0.0
+        # 最近发送的按键被观察到的时刻及其延迟，下一个按键在延迟结束后发送
+        self.sent_at = None
+        self.sent_delay = 0.0
+    
+    def _next_stroke(self):
+        while self.index >= len(self.batch):
+            if not self.upcoming:
+                return None
+            self.batch = self.upcoming.popleft()
+            self.index = 0
+        stroke = self.batch[self.index]
+        self.index += 1
+        return stroke
+    
+    def _record(self, stroke, at):
+        self.journal.record(stroke.key, True, at)
+        self.journal.record(stroke.key, False, at)
+    
+    def advance(self, offset, step, now=None):
+        """子进程已处理 offset 个按键，最近一次前进了 step 个"""
+        now = now if now is not None else time.perf_counter()
+        while self.journaled < self.skip:
+            if self._next_stroke() is None:
+                return
+            self.journaled += 1
+        
+        pending = self.pending
+        while pending and self.journaled - len(pending) < offset:
+            stroke = pending.popleft()
+            self.ahead -= stroke.delay
+            self.sent_delay = stroke.delay
+        if step or self.sent_at is None:
+            self.sent_at = now
+        
+        # 下标为 offset 的按键预计在 base 时刻发送，之后的按键依次累加延迟
+        base = self.sent_at + self.sent_delay
+        limit = offset + JOURNAL_LOOKAHEAD_KEYS + 2 * step
+        while self.journaled <= offset or (self.ahead < JOURNAL_LOOKAHEAD_TIME and self.journaled < limit):
+            stroke = self._next_stroke()
+            if stroke is None:
+                return
+            self._record(stroke, base + self.ahead)
+            pending.append(stroke)
+            self.ahead += stroke.delay
+            self.journaled += 1
+    
+    def resume(self, paused_for, now=None):
+        """暂停后继续输入：暂停较久时以新的预计时刻重新记录尚未发送的按键"""
+        if paused_for <= JOURNAL_LOOKAHEAD_TIME:
+            return
+        now = now if now is not None else time.perf_counter()
+        self.sent_at = now
+        self.sent_delay = 0.0
+        at = now
+        for stroke in self.pending:
+            self._record(stroke, at)
+            at += stroke.delay
+
+
+class ProcessTypingEngine:
+    """与 TypingEngine 接口相同、在输入子进程中执行按键计划的引擎"""
+    
+    def __init__(self, typing_process, config, journal=None, progress=None):
+        self.typing_process = typing_process
+        self.config = config
+        self.journal = journal
+        self.progress = progress if progress is not None else ProgressCounter()
+        self.last_stats = None
+        self.first_key_time = None
+    
+    @property
+    def position(self):
+        """已处理的按键数，中止后可据此从原位置继续"""
+        return self.progress.offset
+    
+    def run(self, plan, control=None, start=0, total=None):
+        """执行按键计划，返回成功输入的按键数"""
+        self.first_key_time = None
+        self.typing_process.ensure(self.config)
+        typed, self.first_key_time, self.last_stats = self.typing_process.run(
+            plan, control, start, self.progress, self.journal, total
+        )
+        return typed
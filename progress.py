@@ -0,0 +1,98 @@
+import time
+from collections import deque
+
+# 界面读取进度的间隔（毫秒）
+SAMPLE_INTERVAL_MS = 200
+
+# 速率历史保留的采样数（进度面板的速率曲线）
+DEFAULT_HISTORY = 60
+
+# 平滑当前速率的系数，越大越跟随最新的采样
+RATE_SMOOTHING = 0.3
+
+
+class ProgressCounter:
+    """输入进度的共享计数器
+    
+    输入线程只对普通属性赋值，不加锁、不格式化、不记录日志；界面线程定时
+    读取。读到的各字段可能相差一个按键，对进度显示没有影响。
+    """
+    
+    def __init__(self):
+        self.offset = 0
+        self.total = 0
+        # 本次输入开始时的 offset（从中断位置继续时不为 0）
+        self.initial = 0
+        # 开始输入的时刻（perf_counter）
+        self.started = 0.0
+        self.paused = False
+        self.active = False
+        # 每次开始新的输入时递增，读取方据此区分不同任务
+        self.generation = 0
+    
+    def begin(self, total, offset=0):
+        self.total = total
+        self.offset = offset
+        self.initial = offset
+        self.paused = False
+        self.started = time.perf_counter()
+        self.active = True
+        self.generation += 1
+    
+    def end(self):
+        self.active = False
+        self.paused = False
+
+
+class ProgressSampler:
+    """由界面线程定时读取进度计数器，计算当前速率与剩余时间并保留速率历史"""
+    
+    def __init__(self, counter, history=DEFAULT_HISTORY, smoothing=RATE_SMOOTHING):
+        self.counter = counter
+        self.smoothing = smoothing
+        self.rates = deque([0.0] * history, maxlen=history)
+        self.rate = 0.0
+        # 上一次采样：(generation, offset, 时刻)
+        self._last = None
+    
+    def sample(self, now=None):
+        """读取一次进度，返回包含 offset / total / fraction / rate / eta 等字段的字典"""
+        counter = self.counter
+        now = now if now is not None else time.perf_counter()
+        generation = counter.generation
+        offset = counter.offset
+        total = counter.total
+        active = counter.active
+        paused = counter.paused
+        
+        last = self._last
+        if last is None or last[0] != generation:
+            # 新任务：从开始时刻计算第一个速率
+            self.rate = 0.0
+            start_offset, start_time = counter.initial, counter.started
+        else:
+            start_offset, start_time = last[1], last[2]
+        self._last = (generation, offset, now)
+        
+        elapsed = now - start_time
+        instant = (offset - start_offset) / elapsed if active and elapsed > 0 else 0.0
+        if not active:
+            self.rate = 0.0
+        elif self.rate:
+            self.rate += (instant - self.rate) * self.smoothing
+        else:
+            self.rate = instant
+        self.rates.append(instant)
+        
+        eta = None
+        if active and not paused and self.rate > 0:
+            eta = (total - offset) / self.rate
+        return {
+            'active': active,
+            'paused': paused,
+            'offset': offset,
+            'total': total,
+            'fraction': offset / total if total else 0.0,
+            'rate': self.rate,
+            'eta': eta,
+        }
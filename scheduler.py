@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+from collections import deque
+
+# 剩余等待时间超过该值时先粗略睡眠，最后一段通过自旋等待补齐
+# Python 3.11 之前的 Windows 上 time.sleep 精度约 15.6ms，需要更长的自旋区间
+if sys.platform == 'win32' and sys.version_info < (3, 11):
+    SPIN_THRESHOLD = 0.016
+else:
+    SPIN_THRESHOLD = 0.002
+
+# 落后截止时间超过该值时重新对齐，避免追赶时无间隔地连续发送按键
+MAX_LAG = 0.05
+
+# 用于计算抖动分位数的最大样本数
+MAX_SAMPLES = 10000
+
+
+def percentile(samples, pct):
+    """计算已排序样本的分位数"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+class RunControl:
+    """输入任务的中止与暂停控制，可在任意线程中调用
+    
+    events 为 (aborted, interrupt, resumed) 三个事件对象，跨进程控制时
+    传入 multiprocessing.Event，两个进程各自用同一组事件创建 RunControl。
+    """
+    
+    def __init__(self, events=None):
+        if events is None:
+            events = (threading.Event(), threading.Event(), threading.Event())
+        self.aborted = events[0]
+        # 中止或暂停时置位，用于打断调度器的等待
+        self.interrupt = events[1]
+        self._resumed = events[2]
+        self._resumed.set()
+    
+    def reset(self):
+        """恢复为未中止、未暂停的状态，以便复用"""
+        self.aborted.clear()
+        self.interrupt.clear()
+        self._resumed.set()
+    
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+    
+    def abort(self):
+        """中止任务，暂停中的任务也会立即结束"""
+        self.aborted.set()
+        self.interrupt.set()
+        self._resumed.set()
+    
+    def pause(self):
+        if not self.aborted.is_set():
+            self._resumed.clear()
+            self.interrupt.set()
+    
+    def resume(self):
+        if not self.aborted.is_set():
+            self.interrupt.clear()
+        self._resumed.set()
+    
+    def toggle_pause(self):
+        """切换暂停状态，返回切换后是否处于暂停"""
+        if self.paused:
+            self.resume()
+        else:
+            self.pause()
+        return self.paused
+    
+    def wait_resumed(self):
+        """暂停时阻塞到继续或中止，返回 False 表示已中止"""
+        self._resumed.wait()
+        return not self.aborted.is_set()
+    
+    def sleep(self, seconds):
+        """可被中止或暂停打断的睡眠，被打断时返回 False"""
+        return not self.interrupt.wait(seconds)
+    
+    def checkpoint(self):
+        """在两个操作之间调用：暂停时等待继续，返回 False 表示应当结束"""
+        if self.interrupt.is_set():
+            return self.wait_resumed()
+        return True
+
+
+class DeadlineScheduler:
+    """基于绝对截止时间的调度器，等待误差不会随按键数量累积"""
+    
+    def __init__(self, spin_threshold=SPIN_THRESHOLD, max_lag=MAX_LAG, control=None):
+        self.spin_threshold = spin_threshold
+        self.max_lag = max_lag
+        self.interrupt = control.interrupt if control is not None else None
+        self.start()
+    
+    def start(self):
+        """以当前时刻作为起点重置调度器"""
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time
+        self.nominal = 0.0
+        self.count = 0
+        self.resyncs = 0
+        self.paused_time = 0.0
+        self.lateness = deque(maxlen=MAX_SAMPLES)
+    
+    def rebase(self, paused_since):
+        """暂停结束后以当前时刻为新的截止时间，暂停时长不计入统计"""
+        now = time.perf_counter()
+        self.paused_time += now - paused_since
+        self.deadline = now
+    
+    def wait(self, delay, before_sleep=None):
+        """将截止时间推进 delay 秒并等待到该时刻
+        
+        before_sleep 仅在确实需要等待时调用，已落后于截止时间时跳过，
+        批量注入后端借此把连续的按键合并为一批发送。
+        被 RunControl 中止或暂停打断时立即返回 False。
+        """
+        clock = time.perf_counter
+        self.deadline += delay
+        self.nominal += delay
+        self.count += 1
+        deadline = self.deadline
+        interrupt = self.interrupt
+        
+        remaining = deadline - clock()
+        if remaining > 0 and before_sleep is not None:
+            before_sleep()
+            remaining = deadline - clock()
+        if interrupt is not None and interrupt.is_set():
+            return False
+        if remaining > self.spin_threshold:
+            if interrupt is None:
+                time.sleep(remaining - self.spin_threshold)
+            elif interrupt.wait(remaining - self.spin_threshold):
+                return False
+        
+        # 自旋补齐剩余时间，sleep(0) 让出 GIL 避免阻塞界面线程
+        now = clock()
+        while now < deadline:
+            time.sleep(0)
+            now = clock()
+        
+        late = now - deadline
+        self.lateness.append(late)
+        if late > self.max_lag:
+            # 按键调用本身耗时过长，以当前时刻为新的基准
+            self.deadline = now
+            self.resyncs += 1
+        return True
+    
+    def stats(self):
+        """返回实际速率与调度抖动统计"""
+        elapsed = time.perf_counter() - self.start_time - self.paused_time
+        samples = sorted(self.lateness)
+        return {
+            'count': self.count,
+            'elapsed': elapsed,
+            'nominal': self.nominal,
+            'rate': self.count / elapsed if elapsed > 0 else 0.0,
+            'nominal_rate': self.count / self.nominal if self.nominal > 0 else 0.0,
+            'jitter_mean_ms': sum(samples) / len(samples) * 1000 if samples else 0.0,
+            'jitter_p50_ms': percentile(samples, 50) * 1000,
+            'jitter_p95_ms': percentile(samples, 95) * 1000,
+            'jitter_p99_ms': percentile(samples, 99) * 1000,
+            'jitter_max_ms': samples[-1] * 1000 if samples else 0.0,
+            'resyncs': self.resyncs,
+        }
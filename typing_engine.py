@@ -0,0 +1,204 @@
+import itertools
+import time
+from collections import namedtuple
+from pynput.keyboard import Key
+from injection_backends import PynputBackend
+from progress import ProgressCounter
+from scheduler import DeadlineScheduler
+
+# 按键计划条目：key 为按键对象，delay 为按键后的等待时间（秒），char 为原始字符
+KeyStroke = namedtuple('KeyStroke', ['key', 'delay', 'char'])
+
+# 需要通过特殊按键输入的字符
+SPECIAL_KEYS = {
+    '\n': Key.enter,
+    '\t': Key.tab,
+    ' ': Key.space,  # 空格使用 Key.space，确保正确输入
+}
+
+# 字符类别，每个类别使用独立的延迟
+LETTER = 'letter'  # 英文字母
+SPACE = 'space'    # 空格
+OTHER = 'other'    # 其他字符
+CHAR_CLASSES = (LETTER, SPACE, OTHER)
+
+# 流式生成按键计划时每段的字符数
+SEGMENT_SIZE = 4096
+
+# 中英文混合时，增加延迟避免输入法干扰
+LETTER_DELAY_FACTOR = 2.5  # 英文字母使用基础延迟的2.5倍
+SPACE_DELAY_FACTOR = 1.5   # 空格使用基础延迟的1.5倍
+
+
+def char_class(char):
+    """返回字符所属的延迟类别"""
+    if char.isascii() and char.isalpha():
+        return LETTER
+    elif char == ' ':
+        return SPACE
+    else:
+        return OTHER
+
+
+def default_profile(base_delay):
+    """根据基础延迟生成各字符类别的延迟"""
+    return {
+        LETTER: base_delay * LETTER_DELAY_FACTOR,
+        SPACE: base_delay * SPACE_DELAY_FACTOR,
+        OTHER: base_delay,  # 其他字符使用基础延迟
+    }
+
+
+def delay_profile(config):
+    """从配置获取各字符类别的延迟，自动校准的结果优先于基础延迟"""
+    profile = default_profile(config.get('input_delay', 0.02))
+    for name, delay in (config.get('delay_profile') or {}).items():
+        if name in profile:
+            profile[name] = float(delay)
+    return profile
+
+
+def segment_text(text, size=SEGMENT_SIZE):
+    """把文本切成固定长度的片段，每次只复制一个片段"""
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+def normalize_segments(segments):
+    """统一换行符：\\r\\n 与单独的 \\r 都转换为 \\n，跨片段的 \\r\\n 同样处理"""
+    pending_cr = False
+    for segment in segments:
+        if pending_cr and segment.startswith('\n'):
+            segment = segment[1:]
+        pending_cr = segment.endswith('\r')
+        if '\r' in segment:
+            segment = segment.replace('\r\n', '\n').replace('\r', '\n')
+        yield segment
+
+
+def map_segments(segments, profile):
+    """把每个片段映射为一批按键计划条目"""
+    # 相同字符共享同一个条目，字符分类只对每种字符做一次
+    strokes = {}
+    for segment in segments:
+        batch = []
+        for char in segment:
+            stroke = strokes.get(char)
+            if stroke is None:
+                stroke = KeyStroke(SPECIAL_KEYS.get(char, char), profile[char_class(char)], char)
+                strokes[char] = stroke
+            batch.append(stroke)
+        yield batch
+
+
+def plan_batches(text, profile, segment_size=SEGMENT_SIZE):
+    """按键计划生成流水线：切分 → 统一换行 → 映射为按键，逐段产生按键批次"""
+    return map_segments(normalize_segments(segment_text(text, segment_size)), profile)
+
+
+def plan_length(text):
+    """按键计划的条目数（\\r\\n 只输入一次换行）"""
+    return len(text) - text.count('\r\n')
+
+
+def compile_plan(text, profile):
+    """将文本编译为按键计划，每个按键一个条目"""
+    plan = []
+    for batch in plan_batches(text, profile):
+        plan.extend(batch)
+    return plan
+
+
+def stream_plan(text, profile, segment_size=SEGMENT_SIZE):
+    """按需生成按键计划，内存占用与文本长度无关
+    
+    第一段在调用时立即编译，之后的段在输入过程中逐段生成，由调度器按
+    截止时间依次发送。配合 TypingEngine.run 的 total 参数使用。
+    """
+    batches = plan_batches(text, profile, segment_size)
+    first = next(batches, [])
+    return itertools.chain(first, itertools.chain.from_iterable(batches))
+
+
+class TypingEngine:
+    """按键计划执行引擎"""
+    
+    def __init__(self, logger, controller=None, progress=None):
+        self.logger = logger
+        # controller 为注入后端，需提供 press / release / flush / finish
+        self.controller = controller if controller is not None else PynputBackend()
+        # 进度计数器，界面线程定时读取；未提供时使用私有的计数器
+        self.progress = progress if progress is not None else ProgressCounter()
+        self.last_stats = None
+        # 第一个按键发送完成的时刻（perf_counter）
+        self.first_key_time = None
+    
+    @property
+    def position(self):
+        """已处理的按键数，中止后可据此从原位置继续"""
+        return self.progress.offset
+    
+    def _pause(self, control, scheduler):
+        """暂停直到继续或中止，返回 False 表示已中止"""
+        # 暂停期间不保留按下的修饰键
+        self.controller.finish()
+        self.progress.paused = True
+        self.logger.info(f"已暂停（第 {self.position} 个字符），再次按暂停热键继续")
+        paused_since = time.perf_counter()
+        if not control.wait_resumed():
+            return False
+        self.progress.paused = False
+        scheduler.rebase(paused_since)
+        self.logger.info(f"继续输入（第 {self.position + 1} 个字符）")
+        return True
+    
+    def run(self, plan, control=None, start=0, total=None):
+        """执行按键计划，返回成功输入的按键数
+        
+        plan 为列表，或按顺序产生条目的迭代器（如 stream_plan），后者需
+        通过 total 给出条目总数。control 为 RunControl 时支持中止与暂停；
+        start 为开始的按键下标。进度只写入 self.progress，不记录日志。
+        """
+        press = self.controller.press
+        release = self.controller.release
+        flush = self.controller.flush
+        scheduler = DeadlineScheduler(control=control)
+        wait = scheduler.wait
+        if total is None:
+            total = len(plan)
+        typed = 0
+        progress = self.progress
+        progress.begin(total, start)
+        self.first_key_time = None
+        
+        strokes = itertools.islice(plan, start, None) if start else plan
+        scheduler.start()
+        for i, stroke in enumerate(strokes, start + 1):
+            progress.offset = i
+            try:
+                press(stroke.key)
+                release(stroke.key)
+            except Exception:
+                self.logger.warning("无法输入字符: %r", stroke.char)
+                continue
+            
+            typed += 1
+            if typed == 1:
+                # 第一个按键立即发送，不等待批量后端攒批
+                flush()
+                self.first_key_time = time.perf_counter()
+            if not wait(stroke.delay, flush):
+                if control.aborted.is_set() or not self._pause(control, scheduler):
+                    self.logger.info(f"输入已中止（{self.position}/{total}）")
+                    break
+        
+        progress.end()
+        self.controller.finish()
+        self.last_stats = scheduler.stats()
+        if typed:
+            self.logger.info(
+                f"实际速率: {self.last_stats['rate']:.1f} 字符/秒"
+                f"（目标 {self.last_stats['nominal_rate']:.1f}），"
+                f"抖动 p95: {self.last_stats['jitter_p95_ms']:.2f}ms"
+            )
+        return typed